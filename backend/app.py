@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
 from flask_jwt_extended import (
     JWTManager,
@@ -10,9 +10,14 @@ from auth import auth_bp
 import joblib
 import pickle
 import re
-import string
 import os
-import requests
+import host_health
+import http_client
+import replay
+from micro_batcher import MicroBatcher
+from text_normalizer import build_search_query, clean_extracted_text, preprocess
+from result_cache import bundle_version, result_cache
+from search_cache import normalize_query, search_cache
 from scipy.sparse import hstack
 from nltk.tokenize import sent_tokenize
 import numpy as np
@@ -44,10 +49,12 @@ import io
 
 import nltk
 import os
-from web_checker import check_web_similarity
+import json
+from web_checker import check_web_similarity, declared_charset, iter_web_similarity
 
 # DB connection
 import psycopg2
+from psycopg2.extras import execute_values
 import os
 from dotenv import load_dotenv
 
@@ -78,10 +85,14 @@ app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY")
 jwt = JWTManager(app)
 
 app.register_blueprint(auth_bp)
+
+# Record/replay outbound calls when REPLAY_MODE is set (load testing)
+replay.install_from_env()
 # ----------------------------
 # Load ML bundle
 # ----------------------------
 bundle = joblib.load("combined_fake_news_model.pkl")
+bundle_id = bundle_version("combined_fake_news_model.pkl")
 
 
 model = bundle["model"]
@@ -94,6 +105,71 @@ tfidf = bundle["tfidf"]
 GNEWS_API_KEY = os.getenv("GNEWS_API_KEY")
 GNEWS_ENDPOINT = "https://gnews.io/api/v4/search"
 
+# Overall time budget (seconds) for /cross-verify; 0 disables it
+CROSS_VERIFY_DEADLINE = float(os.getenv("CROSS_VERIFY_DEADLINE", "0")) or None
+
+
+def log_cross_verify(user_id, user_text, result):
+
+    highest_similarity = result.get("highest_similarity", 0)
+    risk_level = result.get("risk_level", "Unknown")
+
+    sources = result.get("sources", [])
+    total_sources = len(sources)
+
+    if user_id and sources:
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        # Keep only UNIQUE source types
+        unique_sources = {
+            src.get("source_type", "Other")
+            for src in sources
+        }
+
+        print("Unique Sources:", unique_sources)
+
+        # Insert each unique source ONLY ONCE
+        for source_type in unique_sources:
+
+            cursor.execute(
+                """
+                INSERT INTO cross_verify_logs
+                (
+                    input_text,
+                    highest_similarity,
+                    risk_level,
+                    total_sources,
+                    source_type,
+                    created_at,
+                    user_id
+                )
+                VALUES
+                (
+                    %s,
+                    %s,
+                    %s,
+                    %s,
+                    %s,
+                    NOW() AT TIME ZONE 'Asia/Kolkata',
+                    %s
+                )
+                """,
+                (
+                    user_text,
+                    highest_similarity,
+                    risk_level,
+                    total_sources,
+                    source_type,
+                    user_id
+                )
+            )
+
+        conn.commit()
+        cursor.close()
+        conn.close()
+
 
 @app.route("/cross-verify", methods=["POST"])
 def cross_verify():
@@ -116,66 +192,9 @@ def cross_verify():
 
     try:
 
-        result = check_web_similarity(user_text)
-
-        highest_similarity = result.get("highest_similarity", 0)
-        risk_level = result.get("risk_level", "Unknown")
-
-        sources = result.get("sources", [])
-        total_sources = len(sources)
-
-        if user_id and sources:
-
-            conn = get_db_connection()
-            cursor = conn.cursor()
-
-            # Keep only UNIQUE source types
-            unique_sources = {
-                src.get("source_type", "Other")
-                for src in sources
-            }
-
-            print("Unique Sources:", unique_sources)
-
-            # Insert each unique source ONLY ONCE
-            for source_type in unique_sources:
-
-                cursor.execute(
-                    """
-                    INSERT INTO cross_verify_logs
-                    (
-                        input_text,
-                        highest_similarity,
-                        risk_level,
-                        total_sources,
-                        source_type,
-                        created_at,
-                        user_id
-                    )
-                    VALUES
-                    (
-                        %s,
-                        %s,
-                        %s,
-                        %s,
-                        %s,
-                        NOW() AT TIME ZONE 'Asia/Kolkata',
-                        %s
-                    )
-                    """,
-                    (
-                        user_text,
-                        highest_similarity,
-                        risk_level,
-                        total_sources,
-                        source_type,
-                        user_id
-                    )
-                )
+        result = check_web_similarity(user_text, deadline=CROSS_VERIFY_DEADLINE)
 
-            conn.commit()
-            cursor.close()
-            conn.close()
+        log_cross_verify(user_id, user_text, result)
 
         return jsonify(result)
 
@@ -183,6 +202,59 @@ def cross_verify():
         print("ERROR:", e)
         return jsonify({"error": "Internal server error"}), 500
     
+# ----------------------------
+# Streaming Cross Verify (SSE)
+# ----------------------------
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.route("/cross-verify-stream", methods=["POST"])
+def cross_verify_stream():
+
+    # JWT is OPTIONAL
+    verify_jwt_in_request(optional=True)
+
+    identity = get_jwt_identity()
+    user_id = int(identity) if identity else None
+
+    data = request.get_json()
+    user_text = data.get("text") if data else None
+
+    if not user_text or len(user_text.strip()) < 20:
+        return jsonify({"error": "Invalid or empty text"}), 400
+
+    def generate():
+        try:
+            for event, payload in iter_web_similarity(user_text, deadline=CROSS_VERIFY_DEADLINE):
+                if event == "summary":
+                    log_cross_verify(user_id, user_text, payload)
+                yield sse_event(event, payload)
+
+        except Exception as e:
+            print("ERROR:", e)
+            yield sse_event("error", {"error": "Internal server error"})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# ----------------------------
+# Diagnostics (outbound calls and caches)
+# ----------------------------
+@app.route("/diagnostics", methods=["GET"])
+@jwt_required()
+def diagnostics():
+    return jsonify({
+        "search_cache": search_cache.stats(),
+        "http_hosts": http_client.get_host_metrics(),
+        "circuit_breakers": host_health.get_host_states()
+    })
+
+
 @app.route("/source-wise-stats", methods=["GET"])
 @jwt_required()
 def source_wise_stats():
@@ -400,14 +472,6 @@ def generate_pdf(report_data):
     buffer.seek(0)
     return buffer
 # ----------------------------
-# Text utilities
-# ----------------------------
-def clean_extracted_text(text: str) -> str:
-    text = re.sub(r"[^\x20-\x7E]+", " ", text)
-    text = re.sub(r"\s+", " ", text)
-    return text.strip()
-
-# ----------------------------
 # PDF extraction
 # ----------------------------
 def extract_text_from_pdf(file_bytes: bytes) -> str:
@@ -446,42 +510,30 @@ def extract_text_from_pdf(file_bytes: bytes) -> str:
 # ----------------------------
 # Preprocessing (MUST MATCH TRAINING)
 # ----------------------------
-def preprocess(text: str) -> str:
-    text = text.lower()
-    text = re.sub(r'\[.*?\]', '', text)
-    text = re.sub(r'https?://\S+|www\.\S+', '', text)
-    text = re.sub(r'<.*?>+', '', text)
-    text = re.sub(r'[%s]' % re.escape(string.punctuation), '', text)
-    text = re.sub(r'\w*\d\w*', '', text)
-    text = re.sub(r'\s+', ' ', text)
-    return text.strip()
-
+# preprocess, clean_extracted_text and build_search_query live in
+# text_normalizer
 def get_sentiment(text: str) -> float:
     return TextBlob(text).sentiment.polarity
 
 # ----------------------------
-# Search Query Builder
+# GNEWS FETCH (cached + coalesced)
 # ----------------------------
-def build_search_query(text):
-    # Lowercase
-    text = text.lower()
-
-    # Remove special characters
-    text = re.sub(r"[^a-zA-Z0-9\s]", "", text)
-
-    # Remove common filler words
-    stop_words = {
-        "the", "is", "are", "was", "were", "including",
-        "and", "at", "of", "in", "to", "for", "with",
-        "on", "by", "a", "an"
-    }
-
-    words = [w for w in text.split() if w not in stop_words]
+def fetch_gnews(params):
+    key = (normalize_query(params["q"]),) + tuple(
+        sorted((k, v) for k, v in params.items() if k not in ("q", "token"))
+    )
 
-    # Keep only first 5–6 strong keywords
-    keywords = words[:6]
+    def fetch():
+        response = http_client.get(GNEWS_ENDPOINT, params=params)
+        return response.status_code, response.json()
 
-    return " ".join(keywords)
+    # Only successful responses are cached (quota errors must not stick)
+    return search_cache.get_or_fetch(
+        "gnews",
+        key,
+        fetch,
+        cache_if=lambda result: result[0] == 200
+    )
 
 
 # ----------------------------
@@ -496,8 +548,7 @@ def search_gnews(query):
     }
 
     try:
-        response = requests.get(GNEWS_ENDPOINT, params=params)
-        data = response.json()
+        _, data = fetch_gnews(params)
     except Exception as e:
         print("GNews API error:", e)
         return []
@@ -556,6 +607,61 @@ def extract_pdf():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# ----------------------------
+# Prediction helpers
+# ----------------------------
+# Upper bound on texts per /predict-batch request
+PREDICT_BATCH_LIMIT = int(os.getenv("PREDICT_BATCH_LIMIT", "500"))
+
+
+def classify_news(cleaned_texts):
+    # One sparse matrix and one predict_proba pass for all texts; the label
+    # is the argmax, which is what model.predict returns
+    X_tfidf = tfidf.transform(cleaned_texts)
+    probabilities = model.predict_proba(X_tfidf)
+    predictions = model.classes_[probabilities.argmax(axis=1)]
+
+    return [
+        ("Fake" if prediction == 0 else "Real", float(row.max()))
+        for prediction, row in zip(predictions, probabilities)
+    ]
+
+
+# Concurrent /predict calls share one classify_news pass
+news_batcher = MicroBatcher(classify_news)
+
+
+def log_analysis(user_id, rows):
+    # rows: (input_text, prediction_label, confidence)
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    # One multi-row INSERT instead of a statement per row
+    execute_values(
+        cursor,
+        """
+        INSERT INTO analysis_logs
+        (
+            input_text,
+            prediction,
+            confidence,
+            created_at,
+            user_id
+        )
+        VALUES %s
+        """,
+        [
+            (text, prediction_label, confidence_val, user_id)
+            for text, prediction_label, confidence_val in rows
+        ],
+        template="(%s, %s, %s, NOW() AT TIME ZONE 'Asia/Kolkata', %s)"
+    )
+
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
 # ----------------------------
 # Prediction API
 # ----------------------------
@@ -577,61 +683,87 @@ def predict():
         return jsonify({"error": "Empty text"}), 400
 
     cleaned = preprocess(text)
-    sentiment = get_sentiment(cleaned)
-    word_count = len(cleaned.split())
 
-    X_tfidf = tfidf.transform([cleaned])
-    X_final = hstack([X_tfidf])
+    def compute():
+        prediction_label, confidence_val = news_batcher.submit(cleaned)
+        return {
+            "label": prediction_label,
+            "confidence": confidence_val,
+            "word_count": len(cleaned.split()),
+            "sentiment": float(get_sentiment(cleaned))
+        }
 
-    prediction = model.predict(X_final)[0]
-    confidence = model.predict_proba(X_final).max()
+    # Everything below depends only on the preprocessed text
+    result = result_cache.get_or_compute("predict", bundle_id, cleaned, compute)
 
-    prediction_label = "Fake" if prediction == 0 else "Real"
-    confidence_val = float(confidence)
+    prediction_label = result["label"]
+    confidence_val = result["confidence"]
 
     # Save ONLY for logged-in users
     if user_id:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """
-            INSERT INTO analysis_logs
-            (
-                input_text,
-                prediction,
-                confidence,
-                created_at,
-                user_id
-            )
-            VALUES
-            (
-                %s,
-                %s,
-                %s,
-                NOW() AT TIME ZONE 'Asia/Kolkata',
-                %s
-            )
-            """,
-            (
-                text,
-                prediction_label,
-                confidence_val,
-                user_id
-            )
-        )
-
-        conn.commit()
-        cursor.close()
-        conn.close()
+        log_analysis(user_id, [(text, prediction_label, confidence_val)])
 
     return jsonify({
         "label": prediction_label,
         "confidence": round(confidence_val, 3),
-        "word_count": word_count,
-        "sentiment": round(float(sentiment), 3)
+        "word_count": result["word_count"],
+        "sentiment": round(result["sentiment"], 3)
     })
 
+
+# ----------------------------
+# Batch Prediction API
+# ----------------------------
+@app.route("/predict-batch", methods=["POST"])
+def predict_batch():
+
+    # JWT is OPTIONAL
+    verify_jwt_in_request(optional=True)
+
+    identity = get_jwt_identity()
+    user_id = int(identity) if identity else None
+
+    data = request.get_json()
+    texts = data.get("texts", [])
+
+    if not isinstance(texts, list) or not texts:
+        return jsonify({"error": "texts must be a non-empty list"}), 400
+
+    if len(texts) > PREDICT_BATCH_LIMIT:
+        return jsonify({
+            "error": f"At most {PREDICT_BATCH_LIMIT} texts per request"
+        }), 400
+
+    # Empty entries get an error in place; the rest are scored together
+    results = [{"error": "Empty text"}] * len(texts)
+
+    valid = [
+        i for i, text in enumerate(texts)
+        if isinstance(text, str) and text.strip()
+    ]
+    cleaned = [preprocess(texts[i]) for i in valid]
+
+    predictions = classify_news(cleaned) if cleaned else []
+
+    log_rows = []
+
+    for i, cleaned_text, (prediction_label, confidence_val) in zip(
+        valid, cleaned, predictions
+    ):
+        results[i] = {
+            "label": prediction_label,
+            "confidence": round(confidence_val, 3),
+            "word_count": len(cleaned_text.split()),
+            "sentiment": round(float(get_sentiment(cleaned_text)), 3)
+        }
+        log_rows.append((texts[i], prediction_label, confidence_val))
+
+    # Save ONLY for logged-in users
+    if user_id and log_rows:
+        log_analysis(user_id, log_rows)
+
+    return jsonify({"results": results})
+
     
 
 # ----------------------------
@@ -658,8 +790,7 @@ def search_news():
         "token": GNEWS_API_KEY
     }
 
-    response = requests.get(GNEWS_ENDPOINT, params=params)
-    raw_data = response.json()
+    api_status, raw_data = fetch_gnews(params)
 
     results = []
 
@@ -741,7 +872,7 @@ def search_news():
     
     return jsonify({
         "query_used": query,
-        "api_status": response.status_code,
+        "api_status": api_status,
         "total_articles_found": raw_data.get("totalArticles"),
         "results": results,
         "coverage_strength": coverage_strength,
@@ -754,6 +885,7 @@ def search_news():
 import joblib
 
 ai_pipeline = joblib.load("ai_detector_realistic.pkl")
+ai_pipeline_id = bundle_version("ai_detector_realistic.pkl")
 
 ai_model = ai_pipeline["model"]
 ai_tfidf = ai_pipeline["tfidf"]
@@ -812,6 +944,33 @@ def extract_stylometric_features(cleaned):
         len(sentences)
     ]])
 
+# ----------------------------
+# Batched AI Prediction
+# ----------------------------
+def predict_text_units(unit_texts):
+    # One TF-IDF matrix, one scaler call and one predict_proba for all
+    # units; returns (prediction, ai_prob, human_prob) per unit
+    cleaned = [unit_text.lower() for unit_text in unit_texts]
+
+    tfidf_features = ai_tfidf.transform(cleaned)
+
+    stylometric = np.vstack([extract_stylometric_features(c) for c in cleaned])
+    stylometric_scaled = ai_scaler.transform(stylometric)
+
+    final_input = hstack([tfidf_features, stylometric_scaled]).tocsr()
+
+    probabilities = ai_model.predict_proba(final_input)
+    predictions = ai_model.classes_[probabilities.argmax(axis=1)]
+
+    return [
+        (prediction, float(row[1]), float(row[0]))
+        for prediction, row in zip(predictions, probabilities)
+    ]
+
+
+# Concurrent /ai-detect calls share one predict_text_units pass
+ai_batcher = MicroBatcher(predict_text_units)
+
 # ----------------------------
 # AI Detection Route
 # ----------------------------
@@ -832,22 +991,15 @@ def ai_detect():
 
     cleaned = text.lower()
 
-    # TF-IDF features
-    tfidf_features = ai_tfidf.transform([cleaned])
-
-    # Stylometric features
-    stylometric = extract_stylometric_features(cleaned)
-    stylometric_scaled = ai_scaler.transform(stylometric)
-
-    # Combine features
-    final_input = hstack([tfidf_features, stylometric_scaled])
-
-    # Prediction
-    prediction = ai_model.predict(final_input)[0]
-    probabilities = ai_model.predict_proba(final_input)[0]
+    def compute():
+        # TF-IDF + stylometric features and prediction, batched with
+        # concurrent requests
+        prediction, ai_prob, human_prob = ai_batcher.submit(cleaned)
+        return [int(prediction), ai_prob, human_prob]
 
-    ai_prob = float(probabilities[1])
-    human_prob = float(probabilities[0])
+    prediction, ai_prob, human_prob = result_cache.get_or_compute(
+        "ai-detect", ai_pipeline_id, cleaned, compute
+    )
 
     confidence = round(max(ai_prob, human_prob) * 100, 2)
 
@@ -907,28 +1059,6 @@ def ai_detect():
         "confidence": confidence
     })
 # ----------------------------
-# Reusable Prediction Function
-# ----------------------------
-def predict_text_unit(unit_text):
-
-    cleaned = unit_text.lower()
-
-    tfidf_features = ai_tfidf.transform([cleaned])
-
-    stylometric = extract_stylometric_features(cleaned)
-    stylometric_scaled = ai_scaler.transform(stylometric)
-
-    final_input = hstack([tfidf_features, stylometric_scaled])
-
-    prediction = ai_model.predict(final_input)[0]
-    probabilities = ai_model.predict_proba(final_input)[0]
-
-    ai_prob = float(probabilities[1])
-    human_prob = float(probabilities[0])
-
-    return prediction, ai_prob, human_prob
-
-# ----------------------------
 # Sentence-Level AI Detection
 # ----------------------------
 @app.route("/ai-detect-sentences", methods=["POST"])
@@ -940,33 +1070,42 @@ def ai_detect_sentences():
     if not text.strip():
         return jsonify({"error": "Empty text"}), 400
 
-    sentences = sent_tokenize(text)
+    def compute():
 
-    results = []
+        sentences = [
+            sentence for sentence in sent_tokenize(text)
+            if len(sentence.strip()) >= 15  # skip extremely short sentences
+        ]
 
-    for sentence in sentences:
+        # One vectorization and predict_proba pass for all sentences
+        predictions = predict_text_units(sentences) if sentences else []
 
-        if len(sentence.strip()) < 15:
-            continue  # skip extremely short sentences
+        results = []
 
-        prediction, ai_prob, human_prob = predict_text_unit(sentence)
+        for sentence, (prediction, ai_prob, human_prob) in zip(sentences, predictions):
 
-        ai_percent = ai_prob * 100
-        human_percent = human_prob * 100
+            ai_percent = ai_prob * 100
+            human_percent = human_prob * 100
 
-        confidence = max(ai_percent, human_percent)
+            confidence = max(ai_percent, human_percent)
 
-        # Confidence smoothing (-4 if too high)
-        if confidence >= 95:
-            confidence -= 4
+            # Confidence smoothing (-4 if too high)
+            if confidence >= 95:
+                confidence -= 4
 
-        results.append({
-            "text": sentence,
-            "ai_probability": round(ai_percent, 2),
-            "human_probability": round(human_percent, 2),
-            "confidence": round(confidence, 2),
-            "label": "AI Likely" if ai_prob > human_prob else "Human Likely"
-        })
+            results.append({
+                "text": sentence,
+                "ai_probability": round(ai_percent, 2),
+                "human_probability": round(human_percent, 2),
+                "confidence": round(confidence, 2),
+                "label": "AI Likely" if ai_prob > human_prob else "Human Likely"
+            })
+
+        return results
+
+    results = result_cache.get_or_compute(
+        "ai-detect-sentences", ai_pipeline_id, text, compute
+    )
 
     return jsonify({"sentences": results})
 
@@ -982,33 +1121,45 @@ def ai_detect_sliding():
     if not text.strip():
         return jsonify({"error": "Empty text"}), 400
 
-    sentences = sent_tokenize(text)
-
     window_size = 4  # change to 3 if needed
 
-    results = []
+    def compute():
 
-    for i in range(len(sentences) - window_size + 1):
+        sentences = sent_tokenize(text)
 
-        chunk = " ".join(sentences[i:i + window_size])
+        chunks = [
+            " ".join(sentences[i:i + window_size])
+            for i in range(len(sentences) - window_size + 1)
+        ]
 
-        prediction, ai_prob, human_prob = predict_text_unit(chunk)
+        # One vectorization and predict_proba pass for all windows
+        predictions = predict_text_units(chunks) if chunks else []
 
-        ai_percent = ai_prob * 100
-        human_percent = human_prob * 100
+        results = []
 
-        confidence = max(ai_percent, human_percent)
+        for chunk, (prediction, ai_prob, human_prob) in zip(chunks, predictions):
 
-        if confidence >= 95:
-            confidence -= 4
+            ai_percent = ai_prob * 100
+            human_percent = human_prob * 100
 
-        results.append({
-            "text": chunk,
-            "ai_probability": round(ai_percent, 2),
-            "human_probability": round(human_percent, 2),
-            "confidence": round(confidence, 2),
-            "label": "AI Likely" if ai_prob > human_prob else "Human Likely"
-        })
+            confidence = max(ai_percent, human_percent)
+
+            if confidence >= 95:
+                confidence -= 4
+
+            results.append({
+                "text": chunk,
+                "ai_probability": round(ai_percent, 2),
+                "human_probability": round(human_percent, 2),
+                "confidence": round(confidence, 2),
+                "label": "AI Likely" if ai_prob > human_prob else "Human Likely"
+            })
+
+        return results
+
+    results = result_cache.get_or_compute(
+        f"ai-detect-sliding:{window_size}", ai_pipeline_id, text, compute
+    )
 
     return jsonify({"segments": results})
 
@@ -1029,7 +1180,20 @@ def analyze_url():
     from newspaper import Article
 
     article = Article(url)
-    article.download()
+
+    # Download through the shared pooled client, then let newspaper parse
+    response = http_client.get(
+        url,
+        headers={"User-Agent": article.config.browser_user_agent}
+    )
+    response.raise_for_status()
+
+    # Same rule as newspaper's own download: without a header charset pass
+    # the bytes so <meta charset> decides, not requests' ISO-8859-1 default
+    if declared_charset(response):
+        article.download(input_html=response.text)
+    else:
+        article.download(input_html=response.content)
     article.parse()
 
     print("TITLE:", article.title)
@@ -0,0 +1,172 @@
+"""Equivalence check and micro-benchmark for text_normalizer.
+
+Usage:
+    python benchmark_normalizer.py check --cases 20000
+    python benchmark_normalizer.py bench --repeat 200
+
+check exits non-zero if any normalizer output differs from the original
+multi-pass implementation kept below.
+"""
+import argparse
+import random
+import re
+import string
+import sys
+import time
+
+import text_normalizer
+
+
+# ==============================
+# Reference Implementations
+# ==============================
+# The original versions, verbatim
+def legacy_clean_text(text):
+    text = text.lower()
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'[^a-z0-9\s]', '', text)
+    return text.strip()
+
+
+def legacy_clean_extracted_text(text: str) -> str:
+    text = re.sub(r"[^\x20-\x7E]+", " ", text)
+    text = re.sub(r"\s+", " ", text)
+    return text.strip()
+
+
+def legacy_preprocess(text: str) -> str:
+    text = text.lower()
+    text = re.sub(r'\[.*?\]', '', text)
+    text = re.sub(r'https?://\S+|www\.\S+', '', text)
+    text = re.sub(r'<.*?>+', '', text)
+    text = re.sub(r'[%s]' % re.escape(string.punctuation), '', text)
+    text = re.sub(r'\w*\d\w*', '', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+
+def legacy_build_search_query(text):
+    text = text.lower()
+    text = re.sub(r"[^a-zA-Z0-9\s]", "", text)
+    stop_words = {
+        "the", "is", "are", "was", "were", "including",
+        "and", "at", "of", "in", "to", "for", "with",
+        "on", "by", "a", "an"
+    }
+    words = [w for w in text.split() if w not in stop_words]
+    keywords = words[:6]
+    return " ".join(keywords)
+
+
+PAIRS = [
+    ("clean_text", legacy_clean_text, text_normalizer.clean_text),
+    ("clean_extracted_text", legacy_clean_extracted_text, text_normalizer.clean_extracted_text),
+    ("preprocess", legacy_preprocess, text_normalizer.preprocess),
+    ("build_search_query", legacy_build_search_query, text_normalizer.build_search_query),
+]
+
+
+# ==============================
+# Inputs
+# ==============================
+# Fragments that exercise every pass and the places where pass order
+# matters (brackets inside URLs, tags around URLs, digits next to
+# punctuation, Unicode whitespace/digits/case folding)
+FRAGMENTS = [
+    "The", "the", "Government", "said", "on", "Tuesday", "in", "a", "an",
+    "COVID-19", "2024", "3rd", "x86_64", "٣٤", "café", "İstanbul", "ΣΟΦΟΣ",
+    "KelvinK", "ﬁle", "[citation needed]", "[", "]", "<b>", "</p>>", "<",
+    ">", "http://example.com/a?b=1", "https://t.co/xyz", "www.site.org",
+    "www.[a", "ht[x]tp://x", "<http://x>", "://", "—", "…", "“quoted”",
+    "it's", "U.S.", "e-mail", "#tag", "@user", "50%", "$5", "\x00", "\x7f",
+    "\x1c", " ", " ", "　", "​", "﻿",
+]
+SEPARATORS = [" ", " ", " ", "  ", "\t", "\n", "\r\n", "", " ", "\x0b", "\x85"]
+
+
+def random_text(rng, words):
+    parts = []
+    for _ in range(words):
+        parts.append(rng.choice(FRAGMENTS))
+        parts.append(rng.choice(SEPARATORS))
+    return "".join(parts)
+
+
+def article_text(rng, chars):
+    words = []
+    total = 0
+    vocabulary = [w for w in FRAGMENTS if w.isascii() and w.strip()]
+    while total < chars:
+        word = rng.choice(vocabulary)
+        words.append(word)
+        total += len(word) + 1
+    return " ".join(words)
+
+
+# ==============================
+# Commands
+# ==============================
+def run_check(args):
+    rng = random.Random(args.seed)
+    inputs = [""] + FRAGMENTS + [random_text(rng, rng.randint(1, 40)) for _ in range(args.cases)]
+
+    failures = 0
+    for name, legacy, fused in PAIRS:
+        for text in inputs:
+            expected = legacy(text)
+            actual = fused(text)
+            if expected != actual:
+                failures += 1
+                if failures <= 10:
+                    print(f"MISMATCH {name}: {text!r}\n  expected {expected!r}\n  actual   {actual!r}")
+        print(f"{name}: {len(inputs)} inputs checked")
+
+    print("OK" if not failures else f"{failures} mismatches")
+    return 1 if failures else 0
+
+
+def run_bench(args):
+    rng = random.Random(args.seed)
+    corpora = [
+        ("short", [article_text(rng, 280) for _ in range(50)]),
+        ("article", [article_text(rng, 5_000) for _ in range(10)]),
+    ]
+
+    print(f"{'function':<22}{'corpus':<10}{'legacy ms':>12}{'fused ms':>12}{'speedup':>10}")
+    for name, legacy, fused in PAIRS:
+        for corpus_name, texts in corpora:
+            timings = []
+            for fn in (legacy, fused):
+                start = time.perf_counter()
+                for _ in range(args.repeat):
+                    for text in texts:
+                        fn(text)
+                timings.append((time.perf_counter() - start) * 1000 / args.repeat)
+            print(
+                f"{name:<22}{corpus_name:<10}{timings[0]:>12.3f}{timings[1]:>12.3f}"
+                f"{timings[0] / timings[1]:>9.2f}x"
+            )
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="text_normalizer equivalence and benchmark")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    check_parser = sub.add_parser("check")
+    check_parser.add_argument("--cases", type=int, default=20_000)
+    check_parser.add_argument("--seed", type=int, default=0)
+
+    bench_parser = sub.add_parser("bench")
+    bench_parser.add_argument("--repeat", type=int, default=200)
+    bench_parser.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+
+    if args.command == "check":
+        return run_check(args)
+    return run_bench(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+"""Benchmark for similarity_model.
+
+Usage:
+    python benchmark_similarity.py run --output bench.json
+    python benchmark_similarity.py compare base.json bench.json
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from similarity_model import (
+    clean_text,
+    compute_overall_similarity,
+    jaccard_similarity,
+    longest_common_substring_ratio,
+    sentence_level_similarity,
+    sliding_window_similarity,
+    tfidf_similarity
+)
+
+
+# ==============================
+# Synthetic Corpora
+# ==============================
+# (name, query chars, document chars)
+CASES = [
+    ("tweet", 280, 280),
+    ("paragraph", 1_500, 5_000),
+    ("article", 2_000, 20_000),
+    ("long", 5_000, 100_000),
+]
+
+OVERLAPS = [0.0, 0.25, 0.5, 1.0]
+
+VOCAB_SIZE = 5_000
+
+
+def make_vocabulary(rng):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return [
+        "".join(rng.choice(letters) for _ in range(rng.randint(2, 10)))
+        for _ in range(VOCAB_SIZE)
+    ]
+
+
+def make_text(rng, vocabulary, size):
+    sentences = []
+    length = 0
+    while length < size:
+        words = [rng.choice(vocabulary) for _ in range(rng.randint(8, 25))]
+        sentence = " ".join(words).capitalize() + "."
+        sentences.append(sentence)
+        length += len(sentence) + 1
+    return " ".join(sentences)[:size]
+
+
+def make_pair(rng, vocabulary, query_size, doc_size, overlap):
+    query = make_text(rng, vocabulary, query_size)
+    document = make_text(rng, vocabulary, doc_size)
+
+    # Splice a contiguous share of the query into the document
+    copied = query[:int(len(query) * overlap)]
+    if copied:
+        at = rng.randint(0, max(len(document) - len(copied), 0))
+        document = document[:at] + copied + document[at + len(copied):]
+
+    return query, document
+
+
+# ==============================
+# Metrics Under Test
+# ==============================
+# Pairwise metrics take cleaned text, as compute_overall_similarity does
+METRICS = {
+    "tfidf_similarity": (tfidf_similarity, True),
+    "sliding_window_similarity": (sliding_window_similarity, True),
+    "longest_common_substring_ratio": (longest_common_substring_ratio, True),
+    "jaccard_similarity": (jaccard_similarity, True),
+    "sentence_level_similarity": (sentence_level_similarity, False),
+    "compute_overall_similarity": (compute_overall_similarity, False),
+}
+
+
+def percentile(samples, q):
+    return round(float(np.percentile(samples, q)), 3)
+
+
+def time_metric(func, text1, text2, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text1, text2)
+        samples.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    func(text1, text2)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "p50_ms": percentile(samples, 50),
+        "p90_ms": percentile(samples, 90),
+        "p99_ms": percentile(samples, 99),
+        "mean_ms": round(float(np.mean(samples)), 3),
+        "peak_kb": round(peak / 1024, 1)
+    }
+
+
+def run(seed, repeat, metrics, cases):
+    vocabulary = make_vocabulary(random.Random(seed))
+
+    results = {}
+
+    for name, query_size, doc_size in CASES:
+        if cases and name not in cases:
+            continue
+
+        for overlap in OVERLAPS:
+            # Seeded per pair so --case/--metric filters leave every other
+            # pair's input unchanged
+            rng = random.Random(f"{seed}/{name}/{overlap}")
+            query, document = make_pair(rng, vocabulary, query_size, doc_size, overlap)
+            cleaned_query = clean_text(query)
+            cleaned_document = clean_text(document)
+
+            for metric in metrics:
+                func, wants_cleaned = METRICS[metric]
+                if wants_cleaned:
+                    args = (cleaned_query, cleaned_document)
+                else:
+                    args = (query, document)
+
+                key = f"{name}/overlap={overlap}/{metric}"
+                results[key] = time_metric(func, *args, repeat)
+                print(f"{key:70s} p50={results[key]['p50_ms']:>10.3f} ms")
+
+    return {
+        "meta": {
+            "seed": seed,
+            "repeat": repeat,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S")
+        },
+        "results": results
+    }
+
+
+# ==============================
+# Run Comparison
+# ==============================
+COMPARED_FIELDS = ["p50_ms", "p99_ms", "peak_kb"]
+
+
+def compare(base, new, tolerance, min_ms):
+    regressions = []
+
+    for key, new_stats in new["results"].items():
+        base_stats = base["results"].get(key)
+        if base_stats is None:
+            continue
+
+        for field in COMPARED_FIELDS:
+            before = base_stats[field]
+            after = new_stats[field]
+
+            # Sub-millisecond timings are mostly noise
+            if field.endswith("_ms") and max(before, after) < min_ms:
+                continue
+
+            if after > before * (1 + tolerance):
+                change = (after - before) / max(before, 1e-9) * 100
+                regressions.append(f"{key} {field}: {before} -> {after} (+{change:.1f}%)")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="similarity_model benchmark")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run")
+    run_parser.add_argument("--output", default="bench_similarity.json")
+    run_parser.add_argument("--seed", type=int, default=1234)
+    run_parser.add_argument("--repeat", type=int, default=5)
+    run_parser.add_argument("--metric", action="append", choices=sorted(METRICS))
+    run_parser.add_argument("--case", action="append", choices=[c[0] for c in CASES])
+
+    compare_parser = sub.add_parser("compare")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--tolerance", type=float, default=0.10)
+    compare_parser.add_argument("--min-ms", type=float, default=1.0)
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        report = run(args.seed, args.repeat, args.metric or list(METRICS), args.case)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print("Saved:", args.output)
+        return 0
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    regressions = compare(base, new, args.tolerance, args.min_ms)
+    for line in regressions:
+        print("REGRESSION", line)
+    if not regressions:
+        print("No regressions")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
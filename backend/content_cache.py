@@ -0,0 +1,160 @@
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+
+# ==============================
+# Extracted Article Cache
+# ==============================
+# Extracted page text keyed by normalized URL, with the validators needed
+# for conditional GETs. SQLite keeps it shared between gunicorn workers.
+CACHE_PATH = os.getenv(
+    "CONTENT_CACHE_PATH",
+    os.path.join(os.getcwd(), "content_cache.sqlite3")
+)
+CACHE_TTL = int(os.getenv("CONTENT_CACHE_TTL", str(6 * 60 * 60)))
+CACHE_MAX_BYTES = int(os.getenv("CONTENT_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+
+TRACKING_PARAMS = {"fbclid", "gclid", "mc_cid", "mc_eid", "ref", "ocid"}
+
+_init_lock = threading.Lock()
+_initialized = set()
+
+
+def normalize_url(url):
+    parts = urlparse(url.strip())
+
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and not (
+        (scheme == "http" and parts.port == 80) or
+        (scheme == "https" and parts.port == 443)
+    ):
+        host = f"{host}:{parts.port}"
+
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    )
+
+    path = parts.path or "/"
+    if len(path) > 1 and path.endswith("/"):
+        path = path[:-1]
+
+    return urlunparse((scheme, host, path, "", urlencode(query), ""))
+
+
+def _connect(path=CACHE_PATH):
+    conn = sqlite3.connect(path, timeout=5)
+
+    with _init_lock:
+        if path not in _initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS content_cache (
+                    url TEXT PRIMARY KEY,
+                    text TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fetched_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    size INTEGER NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS content_cache_accessed "
+                "ON content_cache (accessed_at)"
+            )
+            conn.commit()
+            _initialized.add(path)
+
+    return conn
+
+
+# ==============================
+# Public API
+# ==============================
+def lookup(url, path=CACHE_PATH):
+    key = normalize_url(url)
+    now = time.time()
+
+    conn = _connect(path)
+    try:
+        row = conn.execute(
+            "SELECT text, etag, last_modified, fetched_at FROM content_cache WHERE url=?",
+            (key,)
+        ).fetchone()
+
+        if not row:
+            return None
+
+        conn.execute("UPDATE content_cache SET accessed_at=? WHERE url=?", (now, key))
+        conn.commit()
+    finally:
+        conn.close()
+
+    text, etag, last_modified, fetched_at = row
+
+    return {
+        "text": text,
+        "etag": etag,
+        "last_modified": last_modified,
+        "fresh": now - fetched_at < CACHE_TTL
+    }
+
+
+def revalidated(url, path=CACHE_PATH):
+    # A 304 answer: the stored text is good for another TTL
+    now = time.time()
+    conn = _connect(path)
+    try:
+        conn.execute(
+            "UPDATE content_cache SET fetched_at=?, accessed_at=? WHERE url=?",
+            (now, now, normalize_url(url))
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def store(url, text, etag=None, last_modified=None, path=CACHE_PATH):
+    now = time.time()
+    size = len(text.encode("utf-8"))
+
+    conn = _connect(path)
+    try:
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO content_cache
+            (url, text, etag, last_modified, fetched_at, accessed_at, size)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (normalize_url(url), text, etag, last_modified, now, now, size)
+        )
+        _evict(conn)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _evict(conn):
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM content_cache").fetchone()[0]
+    if total <= CACHE_MAX_BYTES:
+        return
+
+    # Drop least recently used entries until back under the budget
+    freed = 0
+    doomed = []
+    for url, size in conn.execute(
+        "SELECT url, size FROM content_cache ORDER BY accessed_at ASC"
+    ):
+        if total - freed <= CACHE_MAX_BYTES:
+            break
+        doomed.append((url,))
+        freed += size
+
+    conn.executemany("DELETE FROM content_cache WHERE url=?", doomed)
@@ -0,0 +1,106 @@
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+
+# ==============================
+# Per-Host Circuit Breaker
+# ==============================
+# A host that fails FAILURE_THRESHOLD times in a row (exception, non-200 or
+# too little text) is skipped for COOLDOWN seconds. After that one trial
+# request is let through: success closes the circuit, failure reopens it.
+FAILURE_THRESHOLD = int(os.getenv("HOST_FAILURE_THRESHOLD", "3"))
+COOLDOWN = float(os.getenv("HOST_COOLDOWN", "300"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_hosts = {}
+_lock = threading.Lock()
+
+
+def host_key(url):
+    host = urlparse(url).netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def _entry(host):
+    return _hosts.setdefault(host, {
+        "state": CLOSED,
+        "consecutive_failures": 0,
+        "failures": 0,
+        "successes": 0,
+        "skipped": 0,
+        "last_reason": None,
+        "opened_at": None,
+        "trial_in_flight": False
+    })
+
+
+def allow(url):
+    host = host_key(url)
+
+    with _lock:
+        entry = _entry(host)
+
+        if entry["state"] == CLOSED:
+            return True
+
+        if entry["state"] == OPEN and time.time() - entry["opened_at"] >= COOLDOWN:
+            entry["state"] = HALF_OPEN
+
+        if entry["state"] == HALF_OPEN and not entry["trial_in_flight"]:
+            entry["trial_in_flight"] = True
+            return True
+
+        entry["skipped"] += 1
+        return False
+
+
+def record_success(url):
+    with _lock:
+        entry = _entry(host_key(url))
+        entry["successes"] += 1
+        entry["consecutive_failures"] = 0
+        entry["state"] = CLOSED
+        entry["opened_at"] = None
+        entry["trial_in_flight"] = False
+
+
+def record_failure(url, reason):
+    with _lock:
+        entry = _entry(host_key(url))
+        entry["failures"] += 1
+        entry["consecutive_failures"] += 1
+        entry["last_reason"] = reason
+        entry["trial_in_flight"] = False
+
+        if entry["state"] == HALF_OPEN or entry["consecutive_failures"] >= FAILURE_THRESHOLD:
+            entry["state"] = OPEN
+            entry["opened_at"] = time.time()
+
+
+def reset(failure_threshold=None):
+    # Forget every host; the replay harness also lifts the threshold
+    global FAILURE_THRESHOLD
+    with _lock:
+        _hosts.clear()
+        if failure_threshold is not None:
+            FAILURE_THRESHOLD = failure_threshold
+
+
+def get_host_states():
+    now = time.time()
+    with _lock:
+        return {
+            host: {
+                **{k: v for k, v in entry.items() if k != "trial_in_flight"},
+                "retry_in": (
+                    round(max(COOLDOWN - (now - entry["opened_at"]), 0), 1)
+                    if entry["state"] == OPEN else 0
+                )
+            }
+            for host, entry in _hosts.items()
+        }
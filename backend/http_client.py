@@ -0,0 +1,142 @@
+import threading
+import time
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+# ==============================
+# Shared HTTP Client
+# ==============================
+# One pooled session for every outbound call (scraper, GNews, URL analysis)
+# so connections and TLS sessions to the same hosts are reused.
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 10
+DEFAULT_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+POOL_CONNECTIONS = 32
+POOL_MAXSIZE = 16
+
+# Read timeouts are not retried: a slow host would just cost 10 s again.
+# Retry-After is ignored (urllib3 would sleep for as long as the server
+# asks) and 429 is not retried: a rate-limited host or GNews quota will not
+# recover within the backoff.
+RETRY_POLICY = Retry(
+    total=2,
+    connect=2,
+    read=0,
+    status=2,
+    backoff_factor=0.3,
+    status_forcelist=(500, 502, 503, 504),
+    allowed_methods=frozenset(["GET", "HEAD"]),
+    respect_retry_after_header=False,
+    raise_on_status=False
+)
+
+
+def _build_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+        max_retries=RETRY_POLICY
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    # Shared by every request: never keep cookies from scraped sites
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return session
+
+
+_session = _build_session()
+
+
+# ==============================
+# Per-Host Metrics
+# ==============================
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def _record(host, status, elapsed_ms):
+    with _metrics_lock:
+        stats = _metrics.setdefault(host, {
+            "requests": 0,
+            "errors": 0,
+            "total_ms": 0.0,
+            "max_ms": 0.0,
+            "status_codes": {}
+        })
+        stats["requests"] += 1
+        stats["total_ms"] += elapsed_ms
+        stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+        if status is None:
+            stats["errors"] += 1
+        else:
+            code = str(status)
+            stats["status_codes"][code] = stats["status_codes"].get(code, 0) + 1
+
+
+def get_host_metrics():
+    with _metrics_lock:
+        return {
+            host: {
+                **stats,
+                "status_codes": dict(stats["status_codes"]),
+                "avg_ms": round(stats["total_ms"] / max(stats["requests"], 1), 2)
+            }
+            for host, stats in _metrics.items()
+        }
+
+
+# ==============================
+# Requests
+# ==============================
+# Optional hook used by the record/replay harness:
+# interceptor(url, kwargs, real_get) -> response
+_interceptor = None
+
+
+def set_interceptor(interceptor):
+    global _interceptor
+    _interceptor = interceptor
+
+
+def get(url, **kwargs):
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+
+    host = urlparse(url).netloc.lower()
+    start = time.perf_counter()
+
+    try:
+        if _interceptor is not None:
+            response = _interceptor(url, kwargs, _session.get)
+        else:
+            response = _session.get(url, **kwargs)
+    except Exception:
+        _record(host, None, (time.perf_counter() - start) * 1000)
+        raise
+
+    _record(host, response.status_code, (time.perf_counter() - start) * 1000)
+    return response
+
+
+def read_capped(response, max_bytes, chunk_size=64 * 1024):
+    # Read at most max_bytes of the body, then drop the connection
+    chunks = []
+    total = 0
+
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        chunks.append(chunk)
+        total += len(chunk)
+        if total >= max_bytes:
+            break
+
+    response.close()
+
+    return b"".join(chunks)[:max_bytes]
@@ -0,0 +1,104 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+# ==============================
+# Micro-Batching Scheduler
+# ==============================
+# Concurrent single-item requests are collected for up to MAX_WAIT_MS (or
+# until MAX_BATCH_SIZE items are waiting) and run through one vectorized
+# call. Each caller blocks only on its own result.
+MAX_BATCH_SIZE = int(os.getenv("INFERENCE_BATCH_SIZE", "64"))
+MAX_WAIT_MS = float(os.getenv("INFERENCE_BATCH_WAIT_MS", "5"))
+
+
+class MicroBatcher:
+
+    def __init__(self, batch_fn, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        # batch_fn(items) -> results, one per item and in the same order
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._pid = None
+        self._stats = {"items": 0, "batches": 0, "largest_batch": 0}
+
+    def submit(self, item):
+        # Batching off: run inline
+        if self.max_wait_ms <= 0 or self.max_batch_size <= 1:
+            return self.batch_fn([item])[0]
+
+        self._ensure_worker()
+
+        future = Future()
+        self._queue.put((item, future))
+        return future.result()
+
+    def _ensure_worker(self):
+        # Started lazily, and again in a forked (gunicorn) worker
+        with self._lock:
+            if self._worker is not None and self._pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            self._pid = os.getpid()
+            self._worker = threading.Thread(target=self._run, daemon=True)
+            self._worker.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_ms / 1000
+
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run_one(self, item, future):
+        try:
+            results = self.batch_fn([item])
+            if len(results) != 1:
+                raise RuntimeError(f"batch_fn returned {len(results)} results for 1 item")
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(results[0])
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            items = [item for item, _ in batch]
+
+            try:
+                results = self.batch_fn(items)
+                if len(results) != len(items):
+                    raise RuntimeError(
+                        f"batch_fn returned {len(results)} results for {len(items)} items"
+                    )
+            except Exception:
+                # One bad item must not fail everyone else's request:
+                # retry each item on its own
+                for item, future in batch:
+                    self._run_one(item, future)
+            else:
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+
+            with self._lock:
+                self._stats["items"] += len(batch)
+                self._stats["batches"] += 1
+                self._stats["largest_batch"] = max(self._stats["largest_batch"], len(batch))
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
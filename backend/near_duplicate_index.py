@@ -0,0 +1,468 @@
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows dev boxes: single-process locking only
+    fcntl = None
+
+from similarity_model import FINGERPRINT_K, prepare_text
+
+
+# ==============================
+# MinHash / LSH Parameters
+# ==============================
+# Pages are indexed as overlapping chunks of roughly claim size, so a pasted
+# paragraph still has a high Jaccard score against the chunk it came from.
+NUM_PERM = 128
+LSH_BANDS = 32
+LSH_ROWS = NUM_PERM // LSH_BANDS
+
+CHUNK_SIZE = 600
+CHUNK_STEP = 300
+
+MATCH_THRESHOLD = 0.5
+MAX_MATCHES = 5
+
+INDEX_DIR = os.getenv(
+    "NEAR_DUP_INDEX_DIR",
+    os.path.join(os.getcwd(), "near_dup_index")
+)
+
+# Fixed seeds: signatures are persisted and must stay comparable
+_rng = np.random.default_rng(20240611)
+MINHASH_MULT = _rng.integers(1, 2 ** 63, size=NUM_PERM, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+MINHASH_ADD = _rng.integers(0, 2 ** 63, size=NUM_PERM, dtype=np.uint64)
+BAND_MULT = _rng.integers(1, 2 ** 63, size=LSH_ROWS, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+
+SIGNATURE_BYTES = NUM_PERM * 8
+
+
+# ==============================
+# MinHash Signatures
+# ==============================
+def minhash_signature(shingles):
+    shingles = np.unique(shingles)
+    signature = np.empty(NUM_PERM, dtype=np.uint64)
+
+    # 16 permutations at a time keeps the temporary matrix small
+    for start in range(0, NUM_PERM, 16):
+        mult = MINHASH_MULT[start:start + 16, None]
+        add = MINHASH_ADD[start:start + 16, None]
+        values = shingles[None, :] * mult + add
+        values ^= values >> np.uint64(31)
+        signature[start:start + 16] = values.min(axis=1)
+
+    return signature
+
+
+def chunk_signatures(text):
+    # One signature per CHUNK_SIZE window of the cleaned text
+    hashes = prepare_text(text).kgram_hashes
+    signatures = []
+
+    if len(hashes) == 0:
+        return signatures
+
+    last_start = max(len(hashes) - (CHUNK_SIZE - FINGERPRINT_K + 1), 0)
+    starts = list(range(0, last_start + 1, CHUNK_STEP))
+    if starts[-1] != last_start:
+        starts.append(last_start)
+
+    for start in starts:
+        shingles = hashes[start:start + CHUNK_SIZE - FINGERPRINT_K + 1]
+        signatures.append(minhash_signature(shingles))
+
+    return signatures
+
+
+def band_keys(signatures):
+    bands = signatures.reshape(len(signatures), LSH_BANDS, LSH_ROWS)
+    keys = (bands * BAND_MULT).sum(axis=2, dtype=np.uint64)
+    return keys ^ np.arange(LSH_BANDS, dtype=np.uint64)
+
+
+# ==============================
+# On-Disk Index
+# ==============================
+# Layout:
+#   meta.json          {"generation", "sorted_rows"}: which gen-<N>/ is live
+#   index.lock         serializes writers across processes
+#   gen-<N>/
+#     documents.jsonl    {"url", "title", "text"} per document, read by offset
+#     doc_index.jsonl    {"url", "offset", "added_at", "rows"} per document;
+#                        "rows" is the chunk count once it is committed
+#     chunk_docs.u32     document id of every chunk
+#     signatures.u64     NUM_PERM MinHash values per chunk, memory-mapped
+#     band_keys.u64      LSH_BANDS bucket keys per chunk
+#     sorted_keys.u64 /  band keys of the first meta["sorted_rows"] chunks,
+#     sorted_chunks.u32  sorted, so lookups are a binary search on the memmap
+# Writers append to the live generation. Compaction drops documents older
+# than MAX_AGE, keeps the newest 3/4 of MAX_DOCUMENTS, writes them to the
+# next generation directory and switches meta.json over; the slack keeps it
+# rare. Readers take no lock: they only look at rows that doc_index.jsonl
+# has committed, and keep using the old generation until they next refresh.
+# Only chunks added since the last compaction (at most TAIL_CHUNKS) are
+# bucketed in memory.
+MAX_DOCUMENTS = int(os.getenv("NEAR_DUP_INDEX_MAX_DOCS", "20000"))
+MAX_AGE = int(os.getenv("NEAR_DUP_INDEX_MAX_AGE", str(30 * 24 * 60 * 60)))
+TAIL_CHUNKS = int(os.getenv("NEAR_DUP_INDEX_TAIL_CHUNKS", "20000"))
+
+GENERATION_FILES = {
+    "documents": "documents.jsonl",
+    "doc_index": "doc_index.jsonl",
+    "chunk_docs": "chunk_docs.u32",
+    "signatures": "signatures.u64",
+    "band_keys": "band_keys.u64",
+    "sorted_keys": "sorted_keys.u64",
+    "sorted_chunks": "sorted_chunks.u32",
+}
+
+# Rows copied per block during compaction
+COMPACT_BLOCK_ROWS = 4096
+
+
+class NearDuplicateIndex:
+
+    def __init__(self, directory=INDEX_DIR, max_documents=MAX_DOCUMENTS,
+                 max_age=MAX_AGE, tail_chunks=TAIL_CHUNKS):
+        self.directory = directory
+        self.max_documents = max_documents
+        self.max_age = max_age
+        self.tail_chunks = tail_chunks
+        os.makedirs(directory, exist_ok=True)
+
+        self.meta_path = os.path.join(directory, "meta.json")
+        self.lock_path = os.path.join(directory, "index.lock")
+
+        self._lock = threading.Lock()
+        self._reset(None)
+
+    def _generation_paths(self, generation):
+        generation_dir = os.path.join(self.directory, f"gen-{generation}")
+        return {name: os.path.join(generation_dir, filename)
+                for name, filename in GENERATION_FILES.items()}
+
+    def _reset(self, meta):
+        self._generation = meta["generation"] if meta else None
+        self._sorted_rows = meta["sorted_rows"] if meta else 0
+        self._paths = self._generation_paths(self._generation or 0)
+        self._doc_offsets = []
+        self._doc_added = []
+        self._doc_index_read_to = 0
+        self._rows = 0
+        self._urls = {}
+        self._buckets = {}
+        self._chunk_docs = np.zeros(0, dtype=np.uint32)
+        self._signatures = np.zeros((0, NUM_PERM), dtype=np.uint64)
+        self._sorted_keys = np.zeros(0, dtype=np.uint64)
+        self._sorted_chunks = np.zeros(0, dtype=np.uint32)
+
+        if self._sorted_rows:
+            self._sorted_keys = np.memmap(self._paths["sorted_keys"], dtype=np.uint64, mode="r")
+            self._sorted_chunks = np.memmap(self._paths["sorted_chunks"], dtype=np.uint32, mode="r")
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return len(self._doc_offsets)
+
+    # ------------------------------
+    # Cross-process writer lock
+    # ------------------------------
+    def _file_lock(self):
+        handle = open(self.lock_path, "a")
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        return handle
+
+    def _file_unlock(self, handle):
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+        handle.close()
+
+    def _read_meta(self):
+        if not os.path.exists(self.meta_path):
+            return {"generation": 0, "sorted_rows": 0}
+        with open(self.meta_path) as f:
+            return json.load(f)
+
+    def _write_meta(self, meta):
+        tmp_path = self.meta_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.meta_path)
+
+    # ------------------------------
+    # Pick up documents committed by any process
+    # ------------------------------
+    def _refresh(self):
+        meta = self._read_meta()
+        if meta["generation"] != self._generation:
+            self._reset(meta)
+
+        if os.path.exists(self._paths["doc_index"]):
+            with open(self._paths["doc_index"], "rb") as f:
+                f.seek(self._doc_index_read_to)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    entry = json.loads(line)
+                    self._urls[entry["url"]] = len(self._doc_offsets)
+                    self._doc_offsets.append(entry["offset"])
+                    self._doc_added.append(entry["added_at"])
+                    self._rows = entry["rows"]
+                    self._doc_index_read_to += len(line)
+
+        # Chunk files may run ahead of doc_index.jsonl mid-append; rows past
+        # the last committed document are never mapped
+        rows = self._rows
+        known = len(self._signatures)
+
+        if rows <= known:
+            return
+
+        self._signatures = np.memmap(
+            self._paths["signatures"], dtype=np.uint64, mode="r", shape=(rows, NUM_PERM)
+        )
+        self._chunk_docs = np.memmap(
+            self._paths["chunk_docs"], dtype=np.uint32, mode="r", shape=(rows,)
+        )
+
+        # Only chunks past the sorted part need in-memory buckets
+        first = max(known, self._sorted_rows)
+        if rows <= first:
+            return
+
+        keys = np.memmap(
+            self._paths["band_keys"], dtype=np.uint64, mode="r", shape=(rows, LSH_BANDS)
+        )
+        for offset, row in enumerate(np.asarray(keys[first:rows]).tolist()):
+            for key in row:
+                self._buckets.setdefault(key, []).append(first + offset)
+
+    def _candidates(self, keys):
+        candidates = set()
+
+        if len(self._sorted_keys):
+            lo = np.searchsorted(self._sorted_keys, keys, side="left")
+            hi = np.searchsorted(self._sorted_keys, keys, side="right")
+            for start, stop in zip(lo.tolist(), hi.tolist()):
+                if stop > start:
+                    candidates.update(self._sorted_chunks[start:stop].tolist())
+
+        for key in keys.tolist():
+            candidates.update(self._buckets.get(key, ()))
+
+        return candidates
+
+    def _read_document(self, doc_id):
+        with open(self._paths["documents"], "rb") as f:
+            f.seek(self._doc_offsets[doc_id])
+            return json.loads(f.readline())
+
+    def _truncate_uncommitted(self):
+        # An append that failed or died partway leaves bytes no doc_index
+        # entry covers; appending after them would shift every later chunk
+        # id, so cut each file back to the last committed document
+        sizes = {
+            "chunk_docs": self._rows * 4,
+            "signatures": self._rows * SIGNATURE_BYTES,
+            "band_keys": self._rows * LSH_BANDS * 8,
+            "doc_index": self._doc_index_read_to,
+            "documents": 0,
+        }
+        if self._doc_offsets:
+            with open(self._paths["documents"], "rb") as f:
+                f.seek(self._doc_offsets[-1])
+                sizes["documents"] = self._doc_offsets[-1] + len(f.readline())
+
+        for name, size in sizes.items():
+            path = self._paths[name]
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                os.truncate(path, size)
+
+    # ------------------------------
+    # Compaction (writer lock held, in-process lock not)
+    # ------------------------------
+    def _needs_compaction(self):
+        return (
+            len(self._doc_offsets) > self.max_documents or
+            len(self._signatures) - self._sorted_rows > self.tail_chunks or
+            (self._doc_added and time.time() - self._doc_added[0] > self.max_age * 1.25)
+        )
+
+    def _compact(self):
+        # Nothing is appended while the writer lock is held, so a snapshot
+        # stays valid; queries keep reading the live generation meanwhile
+        with self._lock:
+            generation = self._generation or 0
+            paths = self._paths
+            doc_offsets = list(self._doc_offsets)
+            doc_added = list(self._doc_added)
+            signatures = self._signatures
+            rows = len(signatures)
+            chunk_docs = np.asarray(self._chunk_docs[:rows])
+
+        cutoff = time.time() - self.max_age
+        keep = [
+            doc_id for doc_id, added_at in enumerate(doc_added)
+            if added_at >= cutoff
+        ][-(self.max_documents * 3 // 4):]
+        new_ids = np.full(len(doc_offsets), -1, dtype=np.int64)
+        new_ids[keep] = np.arange(len(keep))
+
+        kept_rows = np.flatnonzero(new_ids[chunk_docs] >= 0)
+        kept_docs = new_ids[chunk_docs[kept_rows]]
+        doc_rows = np.searchsorted(kept_docs, np.arange(len(keep)), side="right")
+
+        keys = np.memmap(
+            paths["band_keys"], dtype=np.uint64, mode="r", shape=(rows, LSH_BANDS)
+        )
+        kept_keys = np.asarray(keys[kept_rows])
+        flat_keys = kept_keys.ravel()
+        order = np.argsort(flat_keys, kind="stable")
+
+        new_generation = generation + 1
+        new_paths = self._generation_paths(new_generation)
+        new_dir = os.path.dirname(new_paths["documents"])
+        shutil.rmtree(new_dir, ignore_errors=True)
+        os.makedirs(new_dir)
+
+        kept_keys.tofile(new_paths["band_keys"])
+        kept_docs.astype(np.uint32).tofile(new_paths["chunk_docs"])
+        flat_keys[order].tofile(new_paths["sorted_keys"])
+        (order // LSH_BANDS).astype(np.uint32).tofile(new_paths["sorted_chunks"])
+        del kept_keys, flat_keys, order
+
+        with open(new_paths["signatures"], "wb") as f:
+            for start in range(0, len(kept_rows), COMPACT_BLOCK_ROWS):
+                block = kept_rows[start:start + COMPACT_BLOCK_ROWS]
+                f.write(np.asarray(signatures[block]).tobytes())
+
+        offset = 0
+        with open(paths["documents"], "rb") as source, \
+                open(new_paths["documents"], "wb") as documents, \
+                open(new_paths["doc_index"], "wb") as doc_index:
+            for new_id, doc_id in enumerate(keep):
+                source.seek(doc_offsets[doc_id])
+                line = source.readline()
+                documents.write(line)
+                doc_index.write(json.dumps({
+                    "url": json.loads(line)["url"],
+                    "offset": offset,
+                    "added_at": doc_added[doc_id],
+                    "rows": int(doc_rows[new_id])
+                }).encode("utf-8") + b"\n")
+                offset += len(line)
+
+        self._write_meta({
+            "generation": new_generation,
+            "sorted_rows": len(kept_rows)
+        })
+
+        # The previous generation may still be open in a reader mid-query;
+        # anything older is not
+        for name in os.listdir(self.directory):
+            if name.startswith("gen-") and name[4:].isdigit() and int(name[4:]) < generation:
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+    # ------------------------------
+    # Public API
+    # ------------------------------
+    def add(self, url, title, text, prepared=None):
+        signatures = chunk_signatures(prepared if prepared is not None else text)
+        if not signatures:
+            return False
+
+        handle = self._file_lock()
+        try:
+            with self._lock:
+                self._refresh()
+                if url in self._urls:
+                    return False
+
+                self._truncate_uncommitted()
+
+                doc_id = len(self._doc_offsets)
+                record = json.dumps({"url": url, "title": title, "text": text})
+                signatures = np.vstack(signatures).astype(np.uint64)
+                os.makedirs(os.path.dirname(self._paths["documents"]), exist_ok=True)
+
+                with open(self._paths["documents"], "ab") as f:
+                    offset = f.tell()
+                    f.write(record.encode("utf-8") + b"\n")
+                with open(self._paths["chunk_docs"], "ab") as f:
+                    f.write(np.full(len(signatures), doc_id, dtype=np.uint32).tobytes())
+                with open(self._paths["signatures"], "ab") as f:
+                    f.write(signatures.tobytes())
+                with open(self._paths["band_keys"], "ab") as f:
+                    f.write(band_keys(signatures).tobytes())
+                # Written last: a document is visible once its chunks are
+                with open(self._paths["doc_index"], "ab") as f:
+                    f.write(json.dumps({
+                        "url": url,
+                        "offset": offset,
+                        "added_at": time.time(),
+                        "rows": self._rows + len(signatures)
+                    }).encode("utf-8") + b"\n")
+
+                self._refresh()
+                compact = self._needs_compaction()
+
+            if compact:
+                self._compact()
+
+            return True
+        finally:
+            self._file_unlock(handle)
+
+    def query(self, text, threshold=MATCH_THRESHOLD, limit=MAX_MATCHES, expires=None):
+        # expires: time.monotonic() deadline; chunks left when it passes
+        # are not looked up
+        signatures = chunk_signatures(text)
+        if not signatures:
+            return []
+
+        with self._lock:
+            self._refresh()
+
+            best = {}
+            for signature, keys in zip(signatures, band_keys(np.vstack(signatures))):
+                if expires is not None and time.monotonic() >= expires:
+                    break
+                for chunk_id in self._candidates(keys):
+                    estimate = float(np.mean(self._signatures[chunk_id] == signature))
+                    doc_id = int(self._chunk_docs[chunk_id])
+                    if estimate > best.get(doc_id, 0.0):
+                        best[doc_id] = estimate
+
+            ranked = sorted(
+                ((estimate, doc_id) for doc_id, estimate in best.items() if estimate >= threshold),
+                reverse=True
+            )[:limit]
+
+            matches = []
+            for estimate, doc_id in ranked:
+                document = self._read_document(doc_id)
+                document["estimated_jaccard"] = round(estimate, 3)
+                matches.append(document)
+
+            return matches
+
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+
+def get_default_index():
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = NearDuplicateIndex()
+        return _default_index
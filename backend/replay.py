@@ -0,0 +1,285 @@
+"""Record/replay harness for the cross-verify pipeline.
+
+Record fixtures (needs network):
+    python replay.py record --fixtures fixtures/ --texts claims.json
+
+Load-test /cross-verify against them (no network):
+    python replay.py load --fixtures fixtures/ --texts claims.json \\
+        --requests 100 --concurrency 8 --latency-ms 150 --jitter-ms 100
+
+The same hooks can be switched on in a running server with
+REPLAY_MODE=record|replay and REPLAY_DIR=<fixtures>.
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+import host_health
+import http_client
+
+
+# ==============================
+# Fixture Store
+# ==============================
+class FixtureStore:
+
+    def __init__(self, directory, latency_ms=0, jitter_ms=0):
+        self.directory = directory
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(directory, "http"), exist_ok=True)
+        os.makedirs(os.path.join(directory, "search"), exist_ok=True)
+
+    def _path(self, kind, key):
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, kind, digest + ".json")
+
+    def write(self, kind, key, record):
+        with open(self._path(kind, key), "w") as f:
+            json.dump(record, f)
+
+    def read(self, kind, key):
+        path = self._path(kind, key)
+        if not os.path.exists(path):
+            with self._lock:
+                self.misses += 1
+            print("Replay miss:", kind, key)
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def delay(self, key):
+        # Same key, same delay: runs are reproducible
+        jitter = 0
+        if self.jitter_ms:
+            jitter = int(hashlib.sha1(key.encode("utf-8")).hexdigest(), 16) % self.jitter_ms
+        total = self.latency_ms + jitter
+        if total:
+            time.sleep(total / 1000)
+
+
+def http_key(url, kwargs):
+    # API tokens never end up in fixture keys
+    params = kwargs.get("params") or {}
+    params = sorted((k, str(v)) for k, v in params.items() if k != "token")
+    return json.dumps(["GET", url, params])
+
+
+def search_key(provider, query, max_results):
+    return json.dumps([provider, query, max_results])
+
+
+def _build_response(url, record):
+    response = Response()
+    response.url = url
+    response.status_code = record["status"]
+    response.headers = CaseInsensitiveDict(record["headers"])
+    response.encoding = record["encoding"]
+    response._content = base64.b64decode(record["body"])
+    response._content_consumed = True
+    return response
+
+
+# ==============================
+# Hooks
+# ==============================
+def record_http(store):
+    def intercept(url, kwargs, real_get):
+        response = real_get(url, **kwargs)
+        body = response.content
+        store.write("http", http_key(url, kwargs), {
+            "url": url,
+            "status": response.status_code,
+            "headers": dict(response.headers),
+            "encoding": response.encoding,
+            "body": base64.b64encode(body).decode("ascii")
+        })
+        return response
+    return intercept
+
+
+def replay_http(store):
+    def intercept(url, kwargs, real_get):
+        key = http_key(url, kwargs)
+        store.delay(key)
+        record = store.read("http", key)
+        if record is None:
+            record = {"status": 404, "headers": {}, "encoding": "utf-8", "body": ""}
+        return _build_response(url, record)
+    return intercept
+
+
+def install(mode, directory, latency_ms=0, jitter_ms=0):
+    import web_checker
+
+    store = FixtureStore(directory, latency_ms, jitter_ms)
+    real_search = web_checker._search_duckduckgo
+
+    # Replayed 404s and recorded failures must not open circuits: which
+    # sources get scored would depend on request order and timing
+    host_health.reset(failure_threshold=float("inf"))
+
+    if mode == "record":
+        http_client.set_interceptor(record_http(store))
+
+        def search(query, max_results):
+            results = real_search(query, max_results)
+            store.write("search", search_key("duckduckgo", query, max_results), {
+                "query": query,
+                "results": results
+            })
+            return results
+
+    elif mode == "replay":
+        http_client.set_interceptor(replay_http(store))
+
+        def search(query, max_results):
+            key = search_key("duckduckgo", query, max_results)
+            store.delay(key)
+            record = store.read("search", key)
+            return record["results"] if record else []
+
+    else:
+        raise ValueError(f"Unknown replay mode: {mode}")
+
+    web_checker._search_duckduckgo = search
+    print(f"Replay harness: {mode} ({directory})")
+    return store
+
+
+def install_from_env():
+    mode = os.getenv("REPLAY_MODE")
+    if not mode:
+        return None
+    return install(
+        mode,
+        os.getenv("REPLAY_DIR", "replay_fixtures"),
+        int(os.getenv("REPLAY_LATENCY_MS", "0")),
+        int(os.getenv("REPLAY_JITTER_MS", "0"))
+    )
+
+
+# ==============================
+# Drivers
+# ==============================
+def _load_texts(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _isolate_caches():
+    # Caches would hide the replayed latency and make runs order-dependent
+    os.environ.setdefault("CONTENT_CACHE", "0")
+    os.environ.setdefault("NEAR_DUP_INDEX", "0")
+
+
+def run_record(args):
+    _isolate_caches()
+    import web_checker
+
+    install("record", args.fixtures)
+    for text in _load_texts(args.texts):
+        result = web_checker.check_web_similarity(text)
+        print("Recorded:", text[:60], "->", len(result["sources"]), "sources")
+    return 0
+
+
+def run_load(args):
+    _isolate_caches()
+
+    # Full Flask path: routing, JSON, scoring and logging hooks
+    from app import app
+    from search_cache import search_cache
+
+    store = install("replay", args.fixtures, args.latency_ms, args.jitter_ms)
+    search_cache.ttl = 0
+
+    texts = _load_texts(args.texts)
+    client_lock = threading.Lock()
+    latencies = []
+    statuses = {}
+    next_index = [0]
+
+    def worker():
+        client = app.test_client()
+        while True:
+            with client_lock:
+                i = next_index[0]
+                if i >= args.requests:
+                    return
+                next_index[0] += 1
+
+            start = time.perf_counter()
+            response = client.post("/cross-verify", json={"text": texts[i % len(texts)]})
+            elapsed = (time.perf_counter() - start) * 1000
+
+            with client_lock:
+                latencies.append(elapsed)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(args.concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+
+    report = {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "latency_ms": args.latency_ms,
+        "jitter_ms": args.jitter_ms,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(args.requests / wall, 2),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p90_ms": round(float(np.percentile(latencies, 90)), 2),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+        "statuses": statuses,
+        "fixture_misses": store.misses
+    }
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="cross-verify record/replay harness")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = sub.add_parser("record")
+    record_parser.add_argument("--fixtures", required=True)
+    record_parser.add_argument("--texts", required=True)
+
+    load_parser = sub.add_parser("load")
+    load_parser.add_argument("--fixtures", required=True)
+    load_parser.add_argument("--texts", required=True)
+    load_parser.add_argument("--requests", type=int, default=50)
+    load_parser.add_argument("--concurrency", type=int, default=4)
+    load_parser.add_argument("--latency-ms", type=int, default=0)
+    load_parser.add_argument("--jitter-ms", type=int, default=0)
+    load_parser.add_argument("--output")
+
+    args = parser.parse_args()
+
+    if args.command == "record":
+        return run_record(args)
+    return run_load(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
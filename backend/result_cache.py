@@ -0,0 +1,204 @@
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+# ==============================
+# Model Result Cache
+# ==============================
+# Detector results keyed by a hash of (endpoint, model bundle version, the
+# text as the model sees it). An in-process LRU with TTL sits in front of
+# an optional SQLite tier that gunicorn workers share. Memory is bounded by
+# the serialized size of the values as well as their count, and a value
+# bigger than RESULT_CACHE_MAX_VALUE_BYTES (per-sentence results echo the
+# whole input) is returned but not cached.
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", str(24 * 60 * 60)))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "4096"))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESULT_CACHE_MAX_VALUE_BYTES = int(os.getenv("RESULT_CACHE_MAX_VALUE_BYTES", str(1024 * 1024)))
+
+# Empty disables the shared tier
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", "")
+RESULT_CACHE_DISK_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_DISK_MAX_ENTRIES", "100000"))
+
+# The shared tier is trimmed back to its limit once every this many writes
+RESULT_CACHE_DISK_TRIM_EVERY = 256
+
+
+def bundle_version(path):
+    # Content hash of a model file: retraining changes every key
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def result_key(endpoint, version, text):
+    payload = "\0".join([endpoint, version, text])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+
+    def __init__(self, ttl=RESULT_CACHE_TTL, max_entries=RESULT_CACHE_MAX_ENTRIES,
+                 max_bytes=RESULT_CACHE_MAX_BYTES, max_value_bytes=RESULT_CACHE_MAX_VALUE_BYTES,
+                 path=RESULT_CACHE_PATH, disk_max_entries=RESULT_CACHE_DISK_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_value_bytes = max_value_bytes
+        self.path = path
+        self.disk_max_entries = disk_max_entries
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._disk_ready = False
+        self._disk_writes = 0
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "disk_errors": 0}
+
+    # ------------------------------
+    # Shared SQLite tier
+    # ------------------------------
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+
+        if not self._disk_ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS result_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS result_cache_created "
+                "ON result_cache (created_at)"
+            )
+            conn.commit()
+            self._disk_ready = True
+
+        return conn
+
+    def _disk_get(self, key):
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT value, created_at FROM result_cache WHERE key=?",
+                (key,)
+            ).fetchone()
+        finally:
+            conn.close()
+
+        if not row or time.time() - row[1] >= self.ttl:
+            return None, None, None
+
+        # Keep the remaining lifetime when promoting to memory
+        expires = time.monotonic() + self.ttl - (time.time() - row[1])
+        return json.loads(row[0]), expires, len(row[0])
+
+    def _disk_put(self, key, serialized):
+        with self._lock:
+            self._disk_writes += 1
+            trim = self._disk_writes % RESULT_CACHE_DISK_TRIM_EVERY == 0
+
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO result_cache (key, value, created_at) VALUES (?, ?, ?)",
+                (key, serialized, time.time())
+            )
+            if trim:
+                count = conn.execute("SELECT COUNT(*) FROM result_cache").fetchone()[0]
+                if count > self.disk_max_entries:
+                    conn.execute(
+                        """
+                        DELETE FROM result_cache WHERE key IN (
+                            SELECT key FROM result_cache ORDER BY created_at ASC
+                            LIMIT ?
+                        )
+                        """,
+                        (count - self.disk_max_entries,)
+                    )
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ------------------------------
+    # Public API
+    # ------------------------------
+    def _remember(self, key, expires, value, size):
+        if size > self.max_value_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous:
+                self._bytes -= previous[2]
+            self._entries[key] = (expires, value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def get_or_compute(self, endpoint, version, text, compute):
+        # compute() must return a JSON-serializable value
+        key = result_key(endpoint, version, text)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return copy.deepcopy(entry[1])
+
+        if self.path:
+            try:
+                value, expires, size = self._disk_get(key)
+            except Exception as e:
+                print("Result cache error:", e)
+                value = None
+                with self._lock:
+                    self._stats["disk_errors"] += 1
+
+            if value is not None:
+                self._remember(key, expires, value, size)
+                with self._lock:
+                    self._stats["disk_hits"] += 1
+                return copy.deepcopy(value)
+
+        value = compute()
+
+        with self._lock:
+            self._stats["misses"] += 1
+
+        serialized = json.dumps(value)
+        if len(serialized) > self.max_value_bytes:
+            return value
+
+        self._remember(key, time.monotonic() + self.ttl, value, len(serialized))
+
+        if self.path:
+            try:
+                self._disk_put(key, serialized)
+            except Exception as e:
+                print("Result cache error:", e)
+                with self._lock:
+                    self._stats["disk_errors"] += 1
+
+        return copy.deepcopy(value)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, **self._stats}
+
+
+result_cache = ResultCache()
@@ -0,0 +1,105 @@
+import copy
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+
+# ==============================
+# Search Provider Cache
+# ==============================
+# In-process TTL cache for search provider responses. Concurrent misses for
+# the same key are coalesced: one caller (the leader) hits the provider and
+# the others wait for its result. Failures are shared but never cached.
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", "600"))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "2048"))
+
+
+def normalize_query(query):
+    return re.sub(r"\s+", " ", (query or "").strip().lower())
+
+
+class _Flight:
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SearchCache:
+
+    def __init__(self, ttl=SEARCH_CACHE_TTL, max_entries=SEARCH_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _count(self, provider, field):
+        stats = self._stats.setdefault(provider, {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "errors": 0
+        })
+        stats[field] += 1
+
+    def get_or_fetch(self, provider, key, fetch, cache_if=None):
+        key = (provider, key)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self._count(provider, "hits")
+                return copy.deepcopy(entry[1])
+
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+                self._count(provider, "misses")
+            else:
+                self._count(provider, "coalesced")
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return copy.deepcopy(flight.value)
+
+        try:
+            flight.value = fetch()
+        except Exception as e:
+            flight.error = e
+            with self._lock:
+                self._count(provider, "errors")
+            raise
+        else:
+            if cache_if is not None and not cache_if(flight.value):
+                return copy.deepcopy(flight.value)
+            with self._lock:
+                self._entries[key] = (time.monotonic() + self.ttl, flight.value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+        return copy.deepcopy(flight.value)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "providers": {p: dict(s) for p, s in self._stats.items()}
+            }
+
+
+search_cache = SearchCache()
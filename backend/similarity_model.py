@@ -1,25 +1,81 @@
-import re
+import multiprocessing
+import os
+import threading
+import time
 import nltk
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property
 from difflib import SequenceMatcher
-from sklearn.feature_extraction.text import TfidfVectorizer
+from scipy.sparse import diags, vstack
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 
+from text_normalizer import clean_text
+
 
 # ==============================
-# Clean Text
+# Prepared Text
 # ==============================
-def clean_text(text):
-    text = text.lower()
-    text = re.sub(r'\s+', ' ', text)
-    text = re.sub(r'[^a-z0-9\s]', '', text)
-    return text.strip()
+# Everything the metrics derive from a cleaned text, computed at most once.
+# Metric functions accept either a PreparedText or an already-cleaned str.
+class PreparedText:
+
+    def __init__(self, text, cleaned=False):
+        self.text = text if cleaned else clean_text(text)
+        self.tokens = self.text.split()
+        self.word_set = frozenset(self.tokens)
+
+    def __len__(self):
+        return len(self.text)
+
+    @cached_property
+    def kgram_hashes(self):
+        return kgram_hashes(self.text)
+
+    @cached_property
+    def fingerprints(self):
+        return winnow(self.kgram_hashes)
+
+    @cached_property
+    def fingerprint_index(self):
+        return _fingerprint_index(self.kgram_hashes, self.fingerprints)
+
+    @cached_property
+    def simhash(self):
+        return simhash(self.kgram_hashes)
+
+    @cached_property
+    def suffix_automaton(self):
+        return build_suffix_automaton(self.text)
+
+    @cached_property
+    def sentences(self):
+        return [s for s in nltk.sent_tokenize(self.text) if len(s) > 25]
+
+
+def prepare_text(text):
+    if isinstance(text, PreparedText):
+        return text
+    return PreparedText(text)
+
+
+def as_prepared(text):
+    if isinstance(text, PreparedText):
+        return text
+    return PreparedText(text, cleaned=True)
+
+
+def _text(text):
+    return text.text if isinstance(text, PreparedText) else text
 
 
 # ==============================
 # Exact Match Boost
 # ==============================
 def exact_match_score(text1, text2):
+    text1 = _text(text1)
+    text2 = _text(text2)
     if text1 in text2 or text2 in text1:
         return 1.0
     return 0.0
@@ -28,19 +84,92 @@ def exact_match_score(text1, text2):
 # ==============================
 # Longest Common Substring Ratio
 # ==============================
+def build_suffix_automaton(text):
+    # Parallel lists indexed by state: transitions, suffix link, longest
+    # length and the first end position of the state's strings in text
+    transitions = [{}]
+    link = [-1]
+    length = [0]
+    first_end = [-1]
+    last = 0
+
+    for pos, ch in enumerate(text):
+        cur = len(length)
+        transitions.append({})
+        link.append(0)
+        length.append(length[last] + 1)
+        first_end.append(pos)
+
+        p = last
+        while p != -1 and ch not in transitions[p]:
+            transitions[p][ch] = cur
+            p = link[p]
+
+        if p != -1:
+            q = transitions[p][ch]
+            if length[p] + 1 == length[q]:
+                link[cur] = q
+            else:
+                clone = len(length)
+                transitions.append(dict(transitions[q]))
+                link.append(link[q])
+                length.append(length[p] + 1)
+                first_end.append(first_end[q])
+
+                while p != -1 and transitions[p].get(ch) == q:
+                    transitions[p][ch] = clone
+                    p = link[p]
+
+                link[q] = clone
+                link[cur] = clone
+
+        last = cur
+
+    return transitions, link, length, first_end
+
+
+def longest_common_substring(text1, text2):
+    # Returns (length, start in text1, start in text2) in O(len1 + len2)
+    transitions, link, length, first_end = as_prepared(text1).suffix_automaton
+    text2 = _text(text2)
+
+    state = 0
+    matched = 0
+    best = (0, 0, 0)
+
+    for pos, ch in enumerate(text2):
+        while state and ch not in transitions[state]:
+            state = link[state]
+            matched = length[state]
+
+        if ch in transitions[state]:
+            state = transitions[state][ch]
+            matched += 1
+        else:
+            state = 0
+            matched = 0
+
+        if matched > best[0]:
+            best = (
+                matched,
+                first_end[state] - matched + 1,
+                pos - matched + 1
+            )
+
+    return best
+
+
 def longest_common_substring_ratio(text1, text2):
-    matcher = SequenceMatcher(None, text1, text2)
-    match = matcher.find_longest_match(0, len(text1), 0, len(text2))
-    longest = match.size
-    return longest / max(len(text1), 1)
+    longest = longest_common_substring(text1, text2)[0]
+    return longest / max(len(_text(text1)), 1)
 
 
 # ==============================
 # Word Overlap (Jaccard)
 # ==============================
 def jaccard_similarity(text1, text2):
-    words1 = set(text1.split())
-    words2 = set(text2.split())
+    words1 = as_prepared(text1).word_set
+    words2 = as_prepared(text2).word_set
     intersection = words1.intersection(words2)
     union = words1.union(words2)
     return len(intersection) / max(len(union), 1)
@@ -49,20 +178,21 @@ def jaccard_similarity(text1, text2):
 # ==============================
 # TF-IDF Hybrid
 # ==============================
+WORD_NGRAM_PARAMS = {"stop_words": "english", "ngram_range": (1, 3)}
+CHAR_NGRAM_PARAMS = {"analyzer": "char", "ngram_range": (3, 5)}
+
+
 def tfidf_similarity(text1, text2):
 
-    word_vectorizer = TfidfVectorizer(
-        stop_words="english",
-        ngram_range=(1, 3)
-    )
+    text1 = _text(text1)
+    text2 = _text(text2)
+
+    word_vectorizer = TfidfVectorizer(**WORD_NGRAM_PARAMS)
 
     word_matrix = word_vectorizer.fit_transform([text1, text2])
     word_score = cosine_similarity(word_matrix[0:1], word_matrix[1:2])[0][0]
 
-    char_vectorizer = TfidfVectorizer(
-        analyzer="char",
-        ngram_range=(3, 5)
-    )
+    char_vectorizer = TfidfVectorizer(**CHAR_NGRAM_PARAMS)
 
     char_matrix = char_vectorizer.fit_transform([text1, text2])
     char_score = cosine_similarity(char_matrix[0:1], char_matrix[1:2])[0][0]
@@ -71,54 +201,300 @@ def tfidf_similarity(text1, text2):
 
 
 # ==============================
-# Sliding Window Chunk Similarity
+# TF-IDF Hybrid (one query vs many)
 # ==============================
-def sliding_window_similarity(text1, text2, window_size=300):
+# A TfidfVectorizer fitted on a single (query, doc) pair gives every shared
+# term idf = 1 and every unshared term idf = 1 + ln(1.5). Counting n-grams
+# once for all documents lets us rebuild those pairwise weights with sparse
+# products instead of refitting per source. Scores agree with
+# tfidf_similarity to ~1e-12 (float rounding only); a pair with no usable
+# terms scores 0 here instead of raising "empty vocabulary".
+PAIR_UNSHARED_IDF_SQ = (1.0 + np.log(1.5)) ** 2
+
+
+def _pairwise_tfidf_cosine(counts):
+    query = counts[0:1]
+    docs = counts[1:]
+
+    query_sq = query.multiply(query)
+    docs_sq = docs.multiply(docs)
+
+    query_mask = query.copy()
+    query_mask.data[:] = 1
+    docs_mask = docs.copy()
+    docs_mask.data[:] = 1
+
+    dot = np.asarray((docs @ query.T).todense()).ravel()
+
+    shared_query = np.asarray((docs_mask @ query_sq.T).todense()).ravel()
+    shared_docs = np.asarray((docs_sq @ query_mask.T).todense()).ravel()
+    total_query = query_sq.sum()
+    total_docs = np.asarray(docs_sq.sum(axis=1)).ravel()
+
+    query_norm = PAIR_UNSHARED_IDF_SQ * total_query - (PAIR_UNSHARED_IDF_SQ - 1) * shared_query
+    docs_norm = PAIR_UNSHARED_IDF_SQ * total_docs - (PAIR_UNSHARED_IDF_SQ - 1) * shared_docs
+
+    denom = np.sqrt(query_norm * docs_norm)
+    scores = np.zeros(len(dot))
+    nonzero = denom > 0
+    scores[nonzero] = dot[nonzero] / denom[nonzero]
+    return scores
+
+
+def _ngram_counts(params, texts):
+    try:
+        return CountVectorizer(**params).fit_transform(texts).tocsr()
+    except ValueError:
+        # Every text was empty after stop-word removal
+        return None
+
+
+def tfidf_similarity_many(text1, texts):
+
+    if not texts:
+        return np.zeros(0)
+
+    all_texts = [_text(text1)] + [_text(text) for text in texts]
+
+    word_counts = _ngram_counts(WORD_NGRAM_PARAMS, all_texts)
+    char_counts = _ngram_counts(CHAR_NGRAM_PARAMS, all_texts)
+
+    word_scores = np.zeros(len(texts)) if word_counts is None else _pairwise_tfidf_cosine(word_counts)
+    char_scores = np.zeros(len(texts)) if char_counts is None else _pairwise_tfidf_cosine(char_counts)
+
+    return (0.6 * word_scores) + (0.4 * char_scores)
+
+
+# ==============================
+# Winnowing Fingerprints
+# ==============================
+# Char k-grams are hashed with a vectorised rolling hash and winnowed (the
+# minimum hash of every FINGERPRINT_WINDOW consecutive k-grams is kept).
+# With FINGERPRINT_WINDOW <= FINGERPRINT_K any shared run of at least
+# K + WINDOW - 1 characters is fully covered by matching fingerprints.
+FINGERPRINT_K = 8
+FINGERPRINT_WINDOW = 4
+ROLLING_HASH_BASE = np.uint64(1000003)
+
+
+def kgram_hashes(text, k=FINGERPRINT_K):
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype="<u4").astype(np.uint64)
+    count = len(codes) - k + 1
+
+    if count <= 0:
+        return np.zeros(0, dtype=np.uint64)
+
+    hashes = np.zeros(count, dtype=np.uint64)
+    for j in range(k):
+        hashes = hashes * ROLLING_HASH_BASE + codes[j:j + count]
+
+    return hashes
+
+
+def winnow(hashes, window=FINGERPRINT_WINDOW):
+    if len(hashes) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    if len(hashes) <= window:
+        return np.array([int(hashes.argmin())])
+
+    views = np.lib.stride_tricks.sliding_window_view(hashes, window)
+    positions = views.argmin(axis=1) + np.arange(len(views))
+    return np.unique(positions)
+
+
+def fingerprint_index(text, k=FINGERPRINT_K, window=FINGERPRINT_WINDOW):
+    hashes = kgram_hashes(text, k)
+    return _fingerprint_index(hashes, winnow(hashes, window))
+
+
+def _fingerprint_index(hashes, positions):
+    index = {}
+    for pos, h in zip(positions.tolist(), hashes[positions].tolist()):
+        index.setdefault(h, pos)
+
+    return index
+
+
+def winnowing_window_match(text1, text2, window_size=300,
+                           k=FINGERPRINT_K, window=FINGERPRINT_WINDOW):
+
+    if k == FINGERPRINT_K and window == FINGERPRINT_WINDOW:
+        prepared1 = as_prepared(text1)
+        hashes1 = prepared1.kgram_hashes
+        positions1 = prepared1.fingerprints
+        index2 = as_prepared(text2).fingerprint_index
+    else:
+        hashes1 = kgram_hashes(_text(text1), k)
+        positions1 = winnow(hashes1, window)
+        index2 = fingerprint_index(_text(text2), k, window)
+
+    text1 = _text(text1)
+    text2 = _text(text2)
 
     if len(text1) < window_size:
         window_size = max(100, len(text1) // 2)
 
-    max_score = 0
+    step = max(window_size // 2, 1)
+
+    # Mark every text1 character covered by a fingerprint shared with text2
+    starts = [
+        (pos, index2[h])
+        for pos, h in zip(positions1.tolist(), hashes1[positions1].tolist())
+        if h in index2
+    ]
+
+    delta = np.zeros(len(text1) + 1, dtype=np.int64)
+    for pos, _ in starts:
+        delta[pos] += 1
+        delta[pos + k] -= 1
+    covered = np.cumsum(delta[:-1]) > 0
+    prefix = np.concatenate(([0], np.cumsum(covered)))
+
+    # Same shape as SequenceMatcher.ratio(): 2 * matched / total length
+    best_score = 0.0
+    best_window = (0, min(window_size, len(text1)))
+
+    for i in range(0, len(text1), step):
+        end = min(i + window_size, len(text1))
+        matched = int(prefix[end] - prefix[i])
+        score = 2.0 * matched / max((end - i) + len(text2), 1)
+        if score > best_score:
+            best_score = score
+            best_window = (i, end)
+
+    # A fingerprint extends the previous span only if it continues it in
+    # both texts (same offset); the index keeps one text2 position per
+    # hash, so repeated k-grams are checked against the expected position
+    spans = []
+    for pos, pos2 in starts:
+        if pos + k <= best_window[0] or pos >= best_window[1]:
+            continue
+        if spans and pos <= spans[-1]["end1"]:
+            last = spans[-1]
+            expected2 = last["start2"] + (pos - last["start1"])
+            if text1[pos:pos + k] == text2[expected2:expected2 + k]:
+                last["end1"] = max(last["end1"], pos + k)
+                last["end2"] = last["start2"] + (last["end1"] - last["start1"])
+                continue
+        spans.append({"start1": pos, "end1": pos + k, "start2": pos2, "end2": pos2 + k})
+
+    return {
+        "score": best_score,
+        "window": best_window,
+        "spans": spans
+    }
 
-    for i in range(0, len(text1), window_size // 2):
-        chunk = text1[i:i + window_size]
-        score = SequenceMatcher(None, chunk, text2).ratio()
-        if score > max_score:
-            max_score = score
 
-    return max_score
+# ==============================
+# Sliding Window Chunk Similarity
+# ==============================
+def sliding_window_similarity(text1, text2, window_size=300):
+    return winnowing_window_match(text1, text2, window_size)["score"]
 
 
 # ==============================
-# FINAL OVERALL SIMILARITY
+# SimHash (near-duplicate sources)
 # ==============================
-def compute_overall_similarity(text1, text2):
+# 64-bit SimHash over the character k-grams. Republished copies of the same
+# story (wire copy with a different byline or footer) land within a few bits;
+# SimHash only picks candidates, the k-gram overlap confirms them.
+SIMHASH_MAX_DISTANCE = int(os.getenv("SIMHASH_MAX_DISTANCE", "10"))
+NEAR_DUPLICATE_OVERLAP = float(os.getenv("NEAR_DUPLICATE_OVERLAP", "0.85"))
+
+
+def _mix64(hashes):
+    # splitmix64 finalizer: the rolling hashes have weak low bits
+    z = hashes.copy()
+    z ^= z >> np.uint64(30)
+    z *= np.uint64(0xBF58476D1CE4E5B9)
+    z ^= z >> np.uint64(27)
+    z *= np.uint64(0x94D049BB133111EB)
+    z ^= z >> np.uint64(31)
+    return z
+
+
+def simhash(hashes):
+    hashes = np.unique(hashes)
+
+    if len(hashes) == 0:
+        return 0
+
+    bits = np.unpackbits(
+        _mix64(hashes).astype("<u8").view(np.uint8).reshape(-1, 8),
+        axis=1,
+        bitorder="little"
+    )
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 > len(hashes)
 
-    text1 = clean_text(text1)
-    text2 = clean_text(text2)
+    return int(np.packbits(votes, bitorder="little").view("<u8")[0])
 
-    if not text1 or not text2:
+
+def hamming_distance(hash1, hash2):
+    return bin(hash1 ^ hash2).count("1")
+
+
+def kgram_overlap(text1, text2):
+    # Jaccard similarity of the distinct k-gram hashes
+    hashes1 = np.unique(as_prepared(text1).kgram_hashes)
+    hashes2 = np.unique(as_prepared(text2).kgram_hashes)
+
+    union = len(hashes1) + len(hashes2)
+    if union == 0:
         return 0.0
 
-    # 1️⃣ Exact copy
-    exact = exact_match_score(text1, text2)
-    if exact == 1.0:
-        return 100.0
+    shared = len(np.intersect1d(hashes1, hashes2, assume_unique=True))
+    return shared / (union - shared)
 
-    # 2️⃣ Hybrid TF-IDF
-    tfidf_score = tfidf_similarity(text1, text2)
 
-    # 3️⃣ Sequence similarity
-    seq_score = SequenceMatcher(None, text1, text2).ratio()
+def cluster_near_duplicates(documents, max_distance=SIMHASH_MAX_DISTANCE,
+                            min_overlap=NEAR_DUPLICATE_OVERLAP):
+    # Returns, for each document, the index of the first document in its
+    # cluster (itself when it has no earlier near-duplicate)
+    prepared = [prepare_text(doc) for doc in documents]
 
-    # 4️⃣ Longest substring ratio
-    lcs_score = longest_common_substring_ratio(text1, text2)
+    leaders = []
+    clusters = []
 
-    # 5️⃣ Jaccard overlap
-    jaccard_score = jaccard_similarity(text1, text2)
+    for i, doc in enumerate(prepared):
+        leader = i
+
+        if doc.text:
+            for j in leaders:
+                if (
+                    hamming_distance(doc.simhash, prepared[j].simhash) <= max_distance and
+                    kgram_overlap(doc, prepared[j]) >= min_overlap
+                ):
+                    leader = j
+                    break
+
+        if leader == i:
+            leaders.append(i)
+        clusters.append(leader)
+
+    return clusters
 
-    # 6️⃣ Sliding window similarity
-    window_score = sliding_window_similarity(text1, text2)
+
+# ==============================
+# Cheap Upper Bounds
+# ==============================
+def sequence_ratio_bound(len1, len2):
+    # Same bound as SequenceMatcher.real_quick_ratio()
+    return 2.0 * min(len1, len2) / max(len1 + len2, 1)
+
+
+def lcs_ratio_bound(len1, len2):
+    return min(len1, len2) / max(len1, 1)
+
+
+def window_score_bound(len1, len2, window_size=300):
+    if len1 < window_size:
+        window_size = max(100, len1 // 2)
+    chunk = min(window_size, len1)
+    return 2.0 * chunk / max(chunk + len2, 1)
+
+
+def _weighted_score(tfidf_score, seq_score, lcs_score, jaccard_score, window_score):
 
     # Weighted combination
     final_score = (
@@ -132,29 +508,181 @@ def compute_overall_similarity(text1, text2):
     return round(float(final_score) * 100, 2)
 
 
+# ==============================
+# FINAL OVERALL SIMILARITY
+# ==============================
+def compute_overall_similarity(text1, text2):
+    return staged_similarity(text1, text2)["score"]
+
+
+# ==============================
+# Staged Similarity
+# ==============================
+# Metrics run cheapest first. When a cutoff is given and the best score the
+# remaining metrics could still reach is <= cutoff, scoring stops and the
+# score of the metrics computed so far (unknown ones counted as 0) is
+# returned. Without a cutoff every metric runs and the score is exact.
+# expires (time.monotonic() value) stops before the next expensive stage
+# the same way, with "timed_out": True: such a score says nothing about
+# the risk band.
+def _expired(expires):
+    return expires is not None and time.monotonic() >= expires
+
+
+def _staged_result(score, stages, complete, timed_out=False):
+    return {
+        "score": score,
+        "stages": stages,
+        "complete": complete,
+        "timed_out": timed_out
+    }
+
+
+def staged_similarity(text1, text2, tfidf_score=None, cutoff=None, expires=None):
+
+    text1 = prepare_text(text1)
+    text2 = prepare_text(text2)
+
+    stages = []
+
+    if not text1.text or not text2.text:
+        return _staged_result(0.0, stages, True)
+
+    # 1️⃣ Exact copy
+    stages.append("exact")
+    if exact_match_score(text1, text2) == 1.0:
+        return _staged_result(100.0, stages, True)
+
+    if tfidf_score is None and _expired(expires):
+        return _staged_result(0.0, stages, False, True)
+
+    # 2️⃣ Hybrid TF-IDF + 5️⃣ Jaccard overlap, bounds for the rest
+    if tfidf_score is None:
+        tfidf_score = tfidf_similarity(text1, text2)
+    jaccard_score = jaccard_similarity(text1, text2)
+    stages += ["tfidf", "jaccard"]
+
+    len1, len2 = len(text1.text), len(text2.text)
+
+    if cutoff is not None:
+        upper = _weighted_score(
+            tfidf_score,
+            sequence_ratio_bound(len1, len2),
+            lcs_ratio_bound(len1, len2),
+            jaccard_score,
+            window_score_bound(len1, len2)
+        )
+        if upper <= cutoff:
+            return _staged_result(
+                _weighted_score(tfidf_score, 0, 0, jaccard_score, 0), stages, False
+            )
+
+    if _expired(expires):
+        return _staged_result(
+            _weighted_score(tfidf_score, 0, 0, jaccard_score, 0), stages, False, True
+        )
+
+    # 4️⃣ Longest substring ratio + 6️⃣ Sliding window similarity
+    lcs_score = longest_common_substring_ratio(text1, text2)
+    stages.append("lcs")
+
+    if _expired(expires):
+        return _staged_result(
+            _weighted_score(tfidf_score, 0, lcs_score, jaccard_score, 0), stages, False, True
+        )
+
+    window_score = sliding_window_similarity(text1, text2)
+    stages.append("window")
+
+    if _expired(expires):
+        return _staged_result(
+            _weighted_score(tfidf_score, 0, lcs_score, jaccard_score, window_score),
+            stages,
+            False,
+            True
+        )
+
+    # 3️⃣ Sequence similarity
+    matcher = SequenceMatcher(None, text1.text, text2.text)
+
+    if cutoff is not None:
+        upper = _weighted_score(
+            tfidf_score,
+            matcher.quick_ratio(),
+            lcs_score,
+            jaccard_score,
+            window_score
+        )
+        stages.append("quick_ratio")
+        if upper <= cutoff:
+            return _staged_result(
+                _weighted_score(tfidf_score, 0, lcs_score, jaccard_score, window_score),
+                stages,
+                False
+            )
+
+    seq_score = matcher.ratio()
+    stages.append("sequence")
+
+    return _staged_result(
+        _weighted_score(tfidf_score, seq_score, lcs_score, jaccard_score, window_score),
+        stages,
+        True
+    )
+
+
+# ==============================
+# OVERALL SIMILARITY (one query vs many)
+# ==============================
+def staged_similarity_many(text1, documents, cutoff=None, expires=None):
+
+    text1 = prepare_text(text1)
+    prepared = [prepare_text(doc) for doc in documents]
+
+    results = [None] * len(prepared)
+
+    pending = []
+    for i, text2 in enumerate(prepared):
+        if not text1.text or not text2.text or exact_match_score(text1, text2) == 1.0:
+            results[i] = staged_similarity(text1, text2)
+            continue
+        pending.append(i)
+
+    # Out of time: exact copies are all that can be told
+    if _expired(expires):
+        for i in pending:
+            results[i] = _staged_result(0.0, ["exact"], False, True)
+        return results
+
+    tfidf_scores = tfidf_similarity_many(text1, [prepared[i] for i in pending])
+
+    for i, tfidf_score in zip(pending, tfidf_scores):
+        results[i] = staged_similarity(text1, prepared[i], tfidf_score, cutoff, expires)
+
+    return results
+
+
+def compute_overall_similarity_many(text1, documents):
+    return [result["score"] for result in staged_similarity_many(text1, documents)]
+
+
 # ==============================
 # Sentence-Level Similarity
 # ==============================
-def sentence_level_similarity(text1, text2, threshold=0.65):
+SENTENCE_NGRAM_PARAMS = {"stop_words": "english", "ngram_range": (1, 2)}
 
-    text1 = clean_text(text1)
-    text2 = clean_text(text2)
 
-    sentences1 = nltk.sent_tokenize(text1)
-    sentences2 = nltk.sent_tokenize(text2)
+def sentence_level_similarity(text1, text2, threshold=0.65):
 
-    sentences1 = [s for s in sentences1 if len(s) > 25]
-    sentences2 = [s for s in sentences2 if len(s) > 25]
+    sentences1 = prepare_text(text1).sentences
+    sentences2 = prepare_text(text2).sentences
 
     if not sentences1 or not sentences2:
         return []
 
     all_sentences = sentences1 + sentences2
 
-    vectorizer = TfidfVectorizer(
-        stop_words="english",
-        ngram_range=(1, 2)
-    )
+    vectorizer = TfidfVectorizer(**SENTENCE_NGRAM_PARAMS)
 
     tfidf_matrix = vectorizer.fit_transform(all_sentences)
 
@@ -176,3 +704,170 @@ def sentence_level_similarity(text1, text2, threshold=0.65):
             })
 
     return matches
+
+
+# ==============================
+# Sentence-Level Similarity (one query vs many)
+# ==============================
+# Sentences of the query and of every source are counted in one sparse
+# matrix. Each source keeps the idf it would get from its own pairwise fit
+# (df over the query's and that source's sentences only); the idf^2 weights
+# are folded into the source rows so a single sparse product scores every
+# query sentence against every source sentence. Only the best match per
+# (query sentence, source) is kept, so no dense similarity matrix is built.
+# Scores agree with sentence_level_similarity to float rounding.
+def sentence_level_similarity_many(text1, documents, threshold=0.65):
+
+    sentences1 = prepare_text(text1).sentences
+    doc_sentences = [prepare_text(doc).sentences for doc in documents]
+
+    results = [[] for _ in doc_sentences]
+    active = [i for i, sentences in enumerate(doc_sentences) if sentences]
+
+    if not sentences1 or not active:
+        return results
+
+    all_sentences = sentences1 + [s for i in active for s in doc_sentences[i]]
+
+    counts = _ngram_counts(SENTENCE_NGRAM_PARAMS, all_sentences)
+    if counts is None:
+        return results
+
+    counts = counts.astype(np.float64)
+    n1 = len(sentences1)
+    query = counts[:n1]
+
+    sizes = [len(doc_sentences[i]) for i in active]
+    bounds = np.concatenate(([n1], n1 + np.cumsum(sizes)))
+    owner = np.repeat(np.arange(len(active)), sizes)
+
+    query_df = np.asarray((query > 0).sum(axis=0)).ravel()
+
+    source_rows = []
+    idf_sq = []
+
+    for block, size in enumerate(sizes):
+        source = counts[bounds[block]:bounds[block + 1]]
+        source_df = np.asarray((source > 0).sum(axis=0)).ravel()
+
+        n = n1 + size
+        idf = np.log((1 + n) / (1 + query_df + source_df)) + 1
+        idf_sq.append(idf ** 2)
+
+        weighted = source @ diags(idf)
+        norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        source_rows.append(diags(1 / norms) @ weighted @ diags(idf))
+
+    # Norm of each query sentence under each source's idf
+    query_norms = np.sqrt((query.multiply(query) @ np.vstack(idf_sq).T))
+    query_norms[query_norms == 0] = 1
+
+    similarity = (query @ vstack(source_rows).T).tocoo()
+
+    rows = similarity.row
+    cols = similarity.col
+    blocks = owner[cols]
+    scores = similarity.data / query_norms[rows, blocks]
+
+    # Best source sentence per (query sentence, source); ties keep the first
+    keys = rows * len(active) + blocks
+    order = np.lexsort((cols, -scores, keys))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = keys[order][1:] != keys[order][:-1]
+
+    for idx in order[first]:
+        if scores[idx] < threshold:
+            continue
+        block = blocks[idx]
+        results[active[block]].append({
+            "input_sentence": sentences1[rows[idx]],
+            "matched_sentence": doc_sentences[active[block]][cols[idx] - bounds[block] + n1],
+            "similarity": round(float(scores[idx]) * 100, 2)
+        })
+
+    return results
+
+
+# ==============================
+# Process Pool Scoring (opt-in)
+# ==============================
+# Per-source scoring is pure Python, so threads cannot spread it across
+# cores. With SIMILARITY_WORKERS > 0 each source is scored in a persistent
+# process pool. Tasks carry only cleaned strings and the batched TF-IDF
+# score; each worker keeps the query's PreparedText between tasks.
+# Workers are not forked from the calling process: a gunicorn worker runs
+# other threads (micro-batcher, index writer, fetches) whose locks a forked
+# child would inherit mid-hold. They start from a clean forkserver (spawn
+# where that is unavailable) instead, so nltk's data path is passed in.
+SIMILARITY_WORKERS = int(os.getenv("SIMILARITY_WORKERS", "0"))
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+_worker_query = None
+
+
+def _init_worker(nltk_paths):
+    for path in nltk_paths:
+        if path not in nltk.data.path:
+            nltk.data.path.append(path)
+
+
+def _pool_context():
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def get_process_pool():
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=SIMILARITY_WORKERS,
+                mp_context=_pool_context(),
+                initializer=_init_worker,
+                initargs=(list(nltk.data.path),)
+            )
+        return _process_pool
+
+
+def _score_source_task(task):
+    global _worker_query
+    query_text, doc_text, tfidf_score, cutoff, threshold, expires = task
+
+    if _worker_query is None or _worker_query.text != query_text:
+        _worker_query = PreparedText(query_text, cleaned=True)
+
+    document = PreparedText(doc_text, cleaned=True)
+
+    # time.monotonic() is system-wide, so the parent's deadline applies here
+    overall = staged_similarity(_worker_query, document, tfidf_score, cutoff, expires)
+
+    if _expired(expires):
+        return overall, []
+
+    matches = sentence_level_similarity(_worker_query, document, threshold)
+
+    return overall, matches
+
+
+def score_sources_in_pool(text1, documents, cutoff=None, threshold=0.65, expires=None):
+
+    text1 = prepare_text(text1)
+    prepared = [prepare_text(doc) for doc in documents]
+
+    tfidf_scores = tfidf_similarity_many(text1, prepared)
+
+    tasks = [
+        (text1.text, doc.text, float(tfidf_score), cutoff, threshold, expires)
+        for doc, tfidf_score in zip(prepared, tfidf_scores)
+    ]
+
+    # map() yields results in task order, i.e. source order
+    results = list(get_process_pool().map(_score_source_task, tasks))
+
+    overall_results = [overall for overall, _ in results]
+    sentence_matches = [matches for _, matches in results]
+
+    return overall_results, sentence_matches
@@ -0,0 +1,102 @@
+import re
+import string
+
+
+# ==============================
+# Text Normalization
+# ==============================
+# Precompiled versions of the cleaners used on every request. Output is
+# identical to the original multi-pass regex versions (checked by
+# benchmark_normalizer.py). Two rewrites make that possible:
+#   - re.sub(r"\s+", " ", t).strip() == " ".join(t.split()): \s and
+#     str.split() use the same Unicode whitespace definition.
+#   - \w*\d\w* only ever matches whole \w runs that contain a digit, so
+#     anchoring it at a word boundary gives the same matches without
+#     rescanning every run from each of its characters.
+# Passes whose trigger character is absent are skipped.
+
+_ASCII_DELETE_NON_ALNUM = bytes(
+    c for c in range(128)
+    if not (chr(c).isascii() and (chr(c).isalnum() or chr(c).isspace()))
+)
+
+# ASCII control characters (the only non-printable ASCII) become spaces
+_ASCII_CONTROL_TO_SPACE = bytes(
+    c if 0x20 <= c <= 0x7E else 0x20 for c in range(256)
+)
+_ASCII_PUNCTUATION = string.punctuation.encode("ascii")
+
+_NON_ALNUM = re.compile(r"[^a-z0-9\s]+")
+_NON_ALNUM_ANY_CASE = re.compile(r"[^a-zA-Z0-9\s]+")
+_NON_PRINTABLE = re.compile(r"[^\x20-\x7E]+")
+
+_BRACKETS = re.compile(r"\[.*?\]")
+_URLS = re.compile(r"https?://\S+|www\.\S+")
+_TAGS = re.compile(r"<.*?>+")
+_DIGIT_WORDS = re.compile(r"\b[^\W\d]*\d\w*")
+
+_PUNCTUATION_TABLE = str.maketrans("", "", string.punctuation)
+
+SEARCH_STOP_WORDS = frozenset({
+    "the", "is", "are", "was", "were", "including",
+    "and", "at", "of", "in", "to", "for", "with",
+    "on", "by", "a", "an"
+})
+SEARCH_KEYWORDS = 6
+
+
+def _delete_non_alnum(text, pattern):
+    # Keep [a-zA-Z0-9] and whitespace; bytes.translate for ASCII text
+    if text.isascii():
+        return text.encode("ascii").translate(None, _ASCII_DELETE_NON_ALNUM).decode("ascii")
+    return pattern.sub("", text)
+
+
+def clean_text(text):
+    # similarity_model: lower, collapse whitespace, keep [a-z0-9 ], strip
+    text = " ".join(text.lower().split())
+    return _delete_non_alnum(text, _NON_ALNUM).strip()
+
+
+def clean_extracted_text(text):
+    # PDF/OCR output: non-printable runs to spaces, collapse whitespace
+    if text.isascii():
+        text = text.encode("ascii").translate(_ASCII_CONTROL_TO_SPACE).decode("ascii")
+    else:
+        text = _NON_PRINTABLE.sub(" ", text)
+    return " ".join(text.split())
+
+
+def preprocess(text):
+    # Fake-news model input (MUST MATCH TRAINING)
+    text = text.lower()
+
+    if "[" in text:
+        text = _BRACKETS.sub("", text)
+    if "://" in text or "www." in text:
+        text = _URLS.sub("", text)
+    if "<" in text:
+        text = _TAGS.sub("", text)
+
+    if text.isascii():
+        text = text.encode("ascii").translate(None, _ASCII_PUNCTUATION).decode("ascii")
+    else:
+        text = text.translate(_PUNCTUATION_TABLE)
+    text = _DIGIT_WORDS.sub("", text)
+
+    return " ".join(text.split())
+
+
+def build_search_query(text):
+    # First few non-filler words, for news search providers
+    words = _delete_non_alnum(text.lower(), _NON_ALNUM_ANY_CASE).split()
+
+    keywords = []
+    for word in words:
+        if word in SEARCH_STOP_WORDS:
+            continue
+        keywords.append(word)
+        if len(keywords) == SEARCH_KEYWORDS:
+            break
+
+    return " ".join(keywords)
@@ -1,11 +1,39 @@
 from ddgs import DDGS
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from readability import Document
-import requests
+import os
+import time
+from email.message import Message
+import content_cache
+import host_health
+import http_client
+from search_cache import normalize_query, search_cache
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from urllib.parse import urlparse
 
 from urllib.parse import urlparse
 
+# Check the local near-duplicate index of previously scraped pages (opt-in)
+USE_NEAR_DUP_INDEX = os.getenv("NEAR_DUP_INDEX", "0") == "1"
+
+# Serve extracted page text from the on-disk cache when possible
+USE_CONTENT_CACHE = os.getenv("CONTENT_CACHE", "1") == "1"
+
+# Stream pages with a byte budget and parse only <p> content with lxml
+STREAMING_EXTRACTION = os.getenv("STREAMING_EXTRACTION", "1") == "1"
+MAX_HTML_BYTES = int(os.getenv("MAX_HTML_BYTES", str(2 * 1024 * 1024)))
+
+# Stop fetching once a source scores at least this (raw, before the boost);
+# 100 means an exact copy. 0 disables the early stop.
+DECISIVE_SCORE = float(os.getenv("DECISIVE_SCORE", "100"))
+
+# Pages with less extracted text than this are not scored
+MIN_EXTRACTED_LENGTH = 150
+
+# Max pages fetched at the same time per request
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "8"))
+
 def classify_source(url):
     domain = urlparse(url).netloc.lower().replace("www.", "")
 
@@ -90,6 +118,14 @@ def classify_source(url):
     return "News"
 
 def search_duckduckgo(query, max_results=8):
+    return search_cache.get_or_fetch(
+        "duckduckgo",
+        (normalize_query(query), max_results),
+        lambda: _search_duckduckgo(query, max_results)
+    )
+
+
+def _search_duckduckgo(query, max_results):
     results_list = []
 
     with DDGS() as ddgs:
@@ -105,96 +141,319 @@ def search_duckduckgo(query, max_results=8):
     return results_list
 
 
+def _cache_lookup(url):
+    if not USE_CONTENT_CACHE:
+        return None
+    try:
+        return content_cache.lookup(url)
+    except Exception as e:
+        print("Cache error:", e)
+        return None
+
+
+def _cache_revalidated(url):
+    try:
+        content_cache.revalidated(url)
+    except Exception as e:
+        print("Cache error:", e)
+
+
+def _cache_store(url, text, response):
+    if not USE_CONTENT_CACHE or not text:
+        return
+    try:
+        content_cache.store(
+            url,
+            text,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified")
+        )
+    except Exception as e:
+        print("Cache error:", e)
+
+
 def extract_text_from_url(url):
     try:
+        cached = _cache_lookup(url)
+
+        if cached and cached["fresh"]:
+            return cached["text"]
+
+        # Host known to be failing: don't pay its timeout again
+        if not host_health.allow(url):
+            print("Skipping unhealthy host:", host_health.host_key(url))
+            return cached["text"] if cached else ""
+
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
             "Accept-Language": "en-US,en;q=0.9"
         }
 
-        response = requests.get(url, headers=headers, timeout=10)
+        # Stale entry: ask the server whether it changed
+        if cached:
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        response = http_client.get(url, headers=headers, stream=STREAMING_EXTRACTION)
+
+        if response.status_code == 304 and cached:
+            response.close()
+            host_health.record_success(url)
+            _cache_revalidated(url)
+            return cached["text"]
 
         if response.status_code != 200:
+            response.close()
+            host_health.record_failure(url, f"status {response.status_code}")
             return ""
 
-        soup = BeautifulSoup(response.text, "html.parser")
-
-        # Remove scripts and styles
-        for script in soup(["script", "style", "noscript"]):
-            script.decompose()
+        if STREAMING_EXTRACTION:
+            body = http_client.read_capped(response, MAX_HTML_BYTES)
+            text = extract_paragraph_text(body, declared_charset(response))
+        else:
+            text = extract_text_from_html(response.text)
 
-        paragraphs = soup.find_all("p")
+        if len(text) < MIN_EXTRACTED_LENGTH:
+            host_health.record_failure(url, "short extraction")
+        else:
+            host_health.record_success(url)
 
-        text = " ".join(
-            p.get_text(strip=True)
-            for p in paragraphs
-            if len(p.get_text(strip=True)) > 40
-        )
+        _cache_store(url, text, response)
 
-        return text.strip()
+        return text
 
     except Exception as e:
         print("Scrape error:", e)
+        host_health.record_failure(url, type(e).__name__)
         return ""
 
 
+def extract_text_from_html(html):
+    soup = BeautifulSoup(html, "html.parser")
+
+    # Remove scripts and styles
+    for script in soup(["script", "style", "noscript"]):
+        script.decompose()
+
+    paragraphs = soup.find_all("p")
+
+    text = " ".join(
+        p.get_text(strip=True)
+        for p in paragraphs
+        if len(p.get_text(strip=True)) > 40
+    )
+
+    return text.strip()
+
+
+PARAGRAPHS_ONLY = SoupStrainer("p")
+
+
+def declared_charset(response):
+    # Only a charset the Content-Type header actually names; requests
+    # fills in ISO-8859-1 for any text/* type without one
+    message = Message()
+    message["Content-Type"] = response.headers.get("Content-Type", "")
+    return message.get_content_charset()
+
+
+def extract_paragraph_text(body, encoding=None):
+    # Without a header charset BeautifulSoup reads <meta charset> from the
+    # bytes (falling back to detection)
+    soup = BeautifulSoup(
+        body,
+        "lxml",
+        parse_only=PARAGRAPHS_ONLY,
+        from_encoding=encoding
+    )
+
+    for script in soup(["script", "style", "noscript"]):
+        script.decompose()
+
+    texts = (p.get_text(strip=True) for p in soup.find_all("p"))
+
+    return " ".join(t for t in texts if len(t) > 40).strip()
+
+
+# Boost added to every reported source score
+SIMILARITY_BOOST = 15
+
+HIGH_RISK_THRESHOLD = 70
+MODERATE_RISK_THRESHOLD = 45
+
+# Raw scores at or below this can never reach "Moderate" after the boost
+LOW_RISK_CUTOFF = MODERATE_RISK_THRESHOLD - SIMILARITY_BOOST
+
+
+def fetch_result_text(result):
+    url = result["link"]
+
+    print("Processing:", url)
+
+    web_text = extract_text_from_url(url)
+
+    print("Extracted length:", len(web_text))
+
+    return web_text
+
+
+def remaining_time(expires):
+    if expires is None:
+        return None
+    return max(expires - time.monotonic(), 0)
+
+
+def fetch_sources(search_results, max_workers=FETCH_CONCURRENCY, expires=None,
+                  stop_when=None):
+    # Returns (fetched, timed_out, stopped); fetched keeps search order.
+    # stop_when(result, web_text) -> True ends fetching early.
+
+    if not search_results:
+        return [], False, False
+
+    pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(search_results))))
+    futures = [pool.submit(fetch_result_text, result) for result in search_results]
+    owners = dict(zip(futures, search_results))
+
+    not_done = set(futures)
+    stopped = False
+
+    while not_done and not stopped:
+        done, not_done = wait(
+            not_done,
+            timeout=remaining_time(expires),
+            return_when=FIRST_COMPLETED
+        )
+
+        if not done:
+            break
+
+        if stop_when is not None:
+            for future in done:
+                web_text = future.result()
+                if len(web_text) >= MIN_EXTRACTED_LENGTH and stop_when(owners[future], web_text):
+                    stopped = True
+                    break
+
+    # Out of time or decided: drop queued fetches, stop waiting for running ones
+    pool.shutdown(wait=False, cancel_futures=True)
+
+    fetched = []
+
+    for result, future in zip(search_results, futures):
+        if future in not_done:
+            continue
+
+        web_text = future.result()
+
+        if len(web_text) < MIN_EXTRACTED_LENGTH:
+            continue
+
+        fetched.append((result["title"], result["link"], web_text))
+
+    return fetched, bool(not_done) and not stopped, stopped
+
+
 def get_risk_level(score):
-    if score > 70:
+    if score > HIGH_RISK_THRESHOLD:
         return "High"
-    elif score > 45:
+    elif score > MODERATE_RISK_THRESHOLD:
         return "Moderate"
     else:
         return "Low"
 
 
-def check_web_similarity(user_text):
+def _query_index(prepared_user, expires=None):
+    # Pages seen before answer repeat claims even if search is down
+    if not USE_NEAR_DUP_INDEX or remaining_time(expires) == 0:
+        return []
+
+    from near_duplicate_index import get_default_index
+    try:
+        return get_default_index().query(prepared_user, expires=expires)
+    except Exception as e:
+        print("Index error:", e)
+        return []
+
+
+# Index writes (file lock, appends, compaction) stay off the request path
+_index_writer = ThreadPoolExecutor(max_workers=1)
+
+
+def _write_to_index(url, title, web_text, prepared_web):
+    from near_duplicate_index import get_default_index
+    try:
+        get_default_index().add(url, title, web_text, prepared_web)
+    except Exception as e:
+        print("Index error:", e)
+
+
+def _add_to_index(url, title, web_text, prepared_web):
+    if not USE_NEAR_DUP_INDEX:
+        return
+
+    _index_writer.submit(_write_to_index, url, title, web_text, prepared_web)
 
-    # Lazy import (VERY IMPORTANT)
-    from similarity_model import (
-        compute_overall_similarity,
-        sentence_level_similarity
-    )
 
+def _search_sources(user_text):
     query = user_text[:200]
-    search_results = search_duckduckgo(query, max_results=8)
+    try:
+        return search_duckduckgo(query, max_results=8)
+    except Exception as e:
+        print("Search error:", e)
+        return []
 
-    report = []
-    highest_score = 0
 
-    for result in search_results:
-        url = result["link"]
-        title = result["title"]
+def _search_sources_until(user_text, expires):
+    # Returns (search_results, timed_out)
+    if expires is None:
+        return _search_sources(user_text), False
 
-        print("Processing:", url)
+    pool = ThreadPoolExecutor(max_workers=1)
+    future = pool.submit(_search_sources, user_text)
+    pool.shutdown(wait=False)
 
-        web_text = extract_text_from_url(url)
+    try:
+        return future.result(timeout=remaining_time(expires)), False
+    except FutureTimeoutError:
+        print("Search timed out")
+        return [], True
 
-        print("Extracted length:", len(web_text))
 
-        if len(web_text) < 150:
-            continue
+def _source_item(title, url, overall_result, sentence_matches, from_index,
+                 syndicated=False, syndicated_from=None):
+    # syndicated: part of a cluster of copies of one story
+    # syndicated_from: URL of the other copy whose score this source shares
+    # (None for the copy that was scored)
+    return {
+        "title": title,
+        "url": url,
+        "similarity": overall_result["score"],
+        # False: scoring stopped early and similarity is a lower bound
+        "score_complete": overall_result["complete"],
+        "source_type": classify_source(url),
+        "scoring_stages": overall_result["stages"],
+        "from_index": from_index,
+        "syndicated": syndicated,
+        "syndicated_from": syndicated_from,
+        "matched_sentences": sentence_matches[:3]
+    }
 
-        overall_score = compute_overall_similarity(user_text, web_text)
-        sentence_matches = sentence_level_similarity(user_text, web_text)
 
-        if overall_score > highest_score:
-            highest_score = overall_score
+def boost_similarity(score):
+    return round(min(score + SIMILARITY_BOOST, 100.0), 2)
 
-        source_type = classify_source(url)
 
-        report.append({
-    "title": title,
-    "url": url,
-    "similarity": overall_score,
-    "source_type": source_type,
-    "matched_sentences": sentence_matches[:3] })
+def build_similarity_result(report):
 
     # Sort by similarity
     report = sorted(report, key=lambda x: x["similarity"], reverse=True)
 
     if report:
       for item in report:
-        item["similarity"] = round(min(item["similarity"] + 15, 100.0), 2)
+        item["similarity"] = boost_similarity(item["similarity"])
 
     # Recalculate highest AFTER boosting
         highest_score = report[0]["similarity"]
@@ -207,3 +466,326 @@ def check_web_similarity(user_text):
         "risk_level": get_risk_level(highest_score),
         "sources": report
     }
+
+
+def score_decisive(prepared_user, prepared_web, decisive_score=DECISIVE_SCORE, expires=None):
+    # Returns (decisive, overall result or None). The result is scored the
+    # way the final pass scores every source, so the caller keeps it.
+
+    from similarity_model import exact_match_score, staged_similarity
+
+    if not decisive_score or not prepared_user.text or not prepared_web.text:
+        return False, None
+
+    # Exact copy only: no need for the scored stages
+    if decisive_score >= 100 and exact_match_score(prepared_user, prepared_web) != 1.0:
+        return False, None
+
+    result = staged_similarity(
+        prepared_user, prepared_web, cutoff=LOW_RISK_CUTOFF, expires=expires
+    )
+
+    # Below the cutoff the score stops short of it; timed out it is a lower
+    # bound. Either way reaching decisive_score proves it.
+    return result["score"] >= decisive_score, result
+
+
+def check_web_similarity(user_text, deadline=None, decisive_score=DECISIVE_SCORE):
+    # deadline: overall budget in seconds for search, fetch and scoring.
+    # When it runs out the result is built from what finished, with
+    # "partial": True; if it cut scoring short, risk_level is "Unknown"
+    # unless the partial scores already prove "High".
+    # decisive_score: once one source reaches it the remaining fetches are
+    # cancelled and the result ("decisive": True) uses what was gathered.
+
+    # Lazy import (VERY IMPORTANT)
+    from similarity_model import (
+        SIMILARITY_WORKERS,
+        cluster_near_duplicates,
+        prepare_text,
+        score_sources_in_pool,
+        staged_similarity_many,
+        sentence_level_similarity_many
+    )
+
+    expires = None if deadline is None else time.monotonic() + deadline
+
+    prepared_user = prepare_text(user_text)
+
+    indexed = _query_index(prepared_user, expires)
+
+    # Texts and overall results worked out while deciding, by URL
+    prepared_cache = {}
+    scored_cache = {}
+
+    def check_decisive(url, web_text):
+        prepared_web = prepare_text(web_text)
+        prepared_cache[url] = prepared_web
+        decisive, result = score_decisive(prepared_user, prepared_web, decisive_score, expires)
+        if result is not None:
+            scored_cache[url] = result
+        return decisive
+
+    # An indexed page that already settles it saves the whole search
+    decisive = False
+    for document in indexed:
+        if remaining_time(expires) == 0:
+            break
+        if check_decisive(document["url"], document["text"]):
+            decisive = True
+            break
+
+    if decisive:
+        search_results, search_timed_out = [], False
+    else:
+        search_results, search_timed_out = _search_sources_until(user_text, expires)
+
+    def stop_when(result, web_text):
+        return check_decisive(result["link"], web_text)
+
+    fetched, fetch_timed_out, fetch_stopped = fetch_sources(
+        search_results,
+        expires=expires,
+        stop_when=stop_when if decisive_score else None
+    )
+
+    decisive = decisive or fetch_stopped
+    partial = search_timed_out or fetch_timed_out
+
+    # Clean and index every text once for all metrics
+    prepared_sources = [
+        prepared_cache.get(url) or prepare_text(web_text)
+        for _, url, web_text in fetched
+    ]
+
+    for (title, url, web_text), prepared_web in zip(fetched, prepared_sources):
+        _add_to_index(url, title, web_text, prepared_web)
+
+    # Merge indexed pages the live search did not return
+    live_urls = {url for _, url, _ in fetched}
+    indexed_urls = set()
+
+    for document in indexed:
+        if document["url"] in live_urls:
+            continue
+        indexed_urls.add(document["url"])
+        fetched.append((document["title"], document["url"], document["text"]))
+        prepared_sources.append(
+            prepared_cache.get(document["url"]) or prepare_text(document["text"])
+        )
+
+    # Syndicated copies (same wire story on several sites): score one text
+    # per cluster and share the result with the rest
+    clusters = cluster_near_duplicates(prepared_sources)
+    leaders = sorted(set(clusters))
+    leader_position = {leader: position for position, leader in enumerate(leaders)}
+
+    prepared_sources = [prepared_sources[i] for i in leaders]
+
+    # Sources already scored while deciding keep that result
+    overall_results = [scored_cache.get(fetched[i][1]) for i in leaders]
+    all_sentence_matches = [None] * len(leaders)
+    unscored = [p for p, result in enumerate(overall_results) if result is None]
+
+    # The deadline is checked before every expensive stage; scores it cut
+    # short come back with "timed_out": True
+    if (
+        SIMILARITY_WORKERS > 0 and len(unscored) > 1 and
+        remaining_time(expires) != 0
+    ):
+
+        # Spread per-source scoring over the process pool
+        results, sentence_matches = score_sources_in_pool(
+            prepared_user,
+            [prepared_sources[p] for p in unscored],
+            cutoff=LOW_RISK_CUTOFF,
+            expires=expires
+        )
+        for p, result, matches in zip(unscored, results, sentence_matches):
+            overall_results[p] = result
+            all_sentence_matches[p] = matches
+
+    elif unscored:
+
+        # Score every source against the query in one pass, skipping the
+        # expensive metrics for sources that cannot leave the "Low" band
+        results = staged_similarity_many(
+            prepared_user,
+            [prepared_sources[p] for p in unscored],
+            cutoff=LOW_RISK_CUTOFF,
+            expires=expires
+        )
+        for p, result in zip(unscored, results):
+            overall_results[p] = result
+
+    # Sentence matches for the rest from one sparse product
+    unmatched = [p for p, matches in enumerate(all_sentence_matches) if matches is None]
+
+    if unmatched and remaining_time(expires) != 0:
+        sentence_matches = sentence_level_similarity_many(
+            prepared_user,
+            [prepared_sources[p] for p in unmatched]
+        )
+    else:
+        sentence_matches = [[] for _ in unmatched]
+
+    for p, matches in zip(unmatched, sentence_matches):
+        all_sentence_matches[p] = matches
+
+    scores_timed_out = any(result["timed_out"] for result in overall_results)
+    partial = partial or scores_timed_out or remaining_time(expires) == 0
+
+    report = []
+
+    for i, (title, url, _) in enumerate(fetched):
+        leader = clusters[i]
+        position = leader_position[leader]
+
+        report.append(_source_item(
+            title,
+            url,
+            overall_results[position],
+            all_sentence_matches[position],
+            url in indexed_urls,
+            clusters.count(leader) > 1,
+            fetched[leader][1] if leader != i else None
+        ))
+
+    return _finish_result(report, partial, decisive, scores_timed_out)
+
+
+def _finish_result(report, partial, decisive, scores_timed_out):
+    result = build_similarity_result(report)
+    result["partial"] = partial
+    result["decisive"] = decisive
+
+    # Timed-out scores are lower bounds: they can prove "High", nothing else
+    if scores_timed_out and result["risk_level"] != "High":
+        result["risk_level"] = "Unknown"
+
+    return result
+
+
+# ==============================
+# Streaming Cross Verification
+# ==============================
+# Yields ("source", item) as soon as each page is fetched and scored, in
+# completion order, then ("summary", result) with the same shape that
+# check_web_similarity returns. Source items already carry the boosted
+# similarity that the summary will report. deadline works as in
+# check_web_similarity.
+def iter_web_similarity(user_text, deadline=None, decisive_score=DECISIVE_SCORE):
+
+    from similarity_model import (
+        NEAR_DUPLICATE_OVERLAP,
+        SIMHASH_MAX_DISTANCE,
+        hamming_distance,
+        kgram_overlap,
+        prepare_text,
+        staged_similarity,
+        sentence_level_similarity
+    )
+
+    expires = None if deadline is None else time.monotonic() + deadline
+
+    prepared_user = prepare_text(user_text)
+
+    indexed = _query_index(prepared_user, expires)
+
+    search_results, partial = _search_sources_until(user_text, expires)
+
+    report = []
+    live_urls = set()
+    scores_timed_out = False
+
+    # (report item, prepared text, overall result, sentence matches) of
+    # every source scored so far, reused for syndicated copies
+    scored = []
+
+    def score(title, url, web_text, from_index):
+        nonlocal scores_timed_out
+
+        prepared_web = prepare_text(web_text)
+        if not from_index:
+            _add_to_index(url, title, web_text, prepared_web)
+
+        leader_item = None
+
+        for leader_item, prepared_leader, overall_result, sentence_matches in scored:
+            if (
+                hamming_distance(prepared_web.simhash, prepared_leader.simhash) <= SIMHASH_MAX_DISTANCE and
+                kgram_overlap(prepared_web, prepared_leader) >= NEAR_DUPLICATE_OVERLAP
+            ):
+                # Already streamed; the summary marks it too
+                leader_item["syndicated"] = True
+                break
+        else:
+            leader_item = None
+            overall_result = staged_similarity(
+                prepared_user, prepared_web, cutoff=LOW_RISK_CUTOFF, expires=expires
+            )
+            scores_timed_out = scores_timed_out or overall_result["timed_out"]
+
+            if remaining_time(expires) != 0:
+                sentence_matches = sentence_level_similarity(prepared_user, prepared_web)
+            else:
+                sentence_matches = []
+
+        item = _source_item(
+            title,
+            url,
+            overall_result,
+            sentence_matches,
+            from_index,
+            leader_item is not None,
+            leader_item["url"] if leader_item else None
+        )
+        report.append(item)
+
+        if leader_item is None:
+            scored.append((item, prepared_web, overall_result, sentence_matches))
+
+        return dict(item, similarity=boost_similarity(item["similarity"]))
+
+    decisive = False
+
+    if search_results:
+        workers = max(1, min(FETCH_CONCURRENCY, len(search_results)))
+
+        pool = ThreadPoolExecutor(max_workers=workers)
+        futures = {
+            pool.submit(fetch_result_text, result): result
+            for result in search_results
+        }
+
+        try:
+            for future in as_completed(futures, timeout=remaining_time(expires)):
+                result = futures[future]
+                web_text = future.result()
+
+                if len(web_text) < MIN_EXTRACTED_LENGTH:
+                    continue
+
+                live_urls.add(result["link"])
+                yield "source", score(result["title"], result["link"], web_text, False)
+
+                if decisive_score and report[-1]["similarity"] >= decisive_score:
+                    decisive = True
+                    break
+        except FutureTimeoutError:
+            # Out of time: report what was scored so far
+            partial = True
+        finally:
+            # Also runs if the client disconnects mid-stream
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    for document in indexed:
+        if decisive:
+            break
+        if document["url"] in live_urls:
+            continue
+        yield "source", score(document["title"], document["url"], document["text"], True)
+
+    partial = partial or scores_timed_out or remaining_time(expires) == 0
+
+    yield "summary", _finish_result(report, partial, decisive, scores_timed_out)